@@ -0,0 +1,8 @@
+"""
+Configuration package
+Loads .env once, before any module reads its settings from the environment
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
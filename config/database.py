@@ -1,26 +1,168 @@
 """
 Database Configuration - Supabase Connection
+DB_BACKEND=sqlite swaps in the embedded SQLite backend (config/sqlite_db.py),
+which answers the same table().select()...execute() calls
 """
 
 import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-load_dotenv()
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from config.http_clients import PerWorker, make_http_client, warmup
+from utils.metrics import query_table, record_db_call
 
 # Supabase credentials from environment
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-# Create Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# "supabase" (default) or "sqlite" for local runs and tests without Supabase
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", ".cache/local.sqlite3")
+
+# Maximum number of Supabase calls in flight per worker process
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", "10"))
+
+def create_supabase_client():
+    """
+    New Supabase client on a pooled, tuned HTTP transport
+    (keep-alive pool, HTTP/2 and timeouts from config/http_clients.py)
+    supabase is imported here, on first use, to keep app startup fast
+    """
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in the environment or .env file")
+    from supabase import create_client, ClientOptions
+    
+    options = ClientOptions(httpx_client=make_http_client(follow_redirects=True))
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+
+def create_db_client():
+    """
+    Client for the configured DB_BACKEND
+    """
+    if DB_BACKEND == "sqlite":
+        from config.sqlite_db import SQLiteClient
+        return SQLiteClient(SQLITE_PATH)
+    if DB_BACKEND != "supabase":
+        raise RuntimeError(f"Unknown DB_BACKEND {DB_BACKEND!r}, expected supabase or sqlite")
+    return create_supabase_client()
+
+def close_db_client(client):
+    if DB_BACKEND == "sqlite":
+        client.close()
+    else:
+        client.postgrest.session.close()
+
+# One database client (and connection pool) per worker process, built on first use
+supabase_client = PerWorker(create_db_client, close=close_db_client)
+
+# Dedicated thread pool for blocking Supabase calls
+# Extra queries queue here instead of piling up on the event loop
+db_executor = ThreadPoolExecutor(
+    max_workers=DB_MAX_CONCURRENCY,
+    thread_name_prefix="supabase"
+)
 
 def get_db():
     """
-    Returns the Supabase client instance
+    Returns the database client instance (Supabase, or SQLite with DB_BACKEND=sqlite)
     Use this in your routes to access the database
     """
-    return supabase
+    return supabase_client.get()
+
+def warmup_db():
+    """
+    Open pooled connections to Supabase before the first request
+    """
+    client = get_db()
+    if DB_BACKEND == "sqlite":
+        return None
+    return warmup(
+        client.postgrest.session,
+        f"{SUPABASE_URL}/rest/v1/",
+        headers={"apikey": SUPABASE_KEY},
+        connections=DB_MAX_CONCURRENCY
+    )
+
+async def run_query(query):
+    """
+    Execute a Supabase query without blocking the event loop
+    The blocking HTTP call runs on the bounded database thread pool
+    Its duration and the wait for a pool thread are recorded in utils/metrics.py
+    """
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+    started = finished = None
+    
+    def execute():
+        nonlocal started, finished
+        started = time.perf_counter()
+        try:
+            return query.execute()
+        finally:
+            finished = time.perf_counter()
+    
+    failed = True
+    try:
+        result = await loop.run_in_executor(db_executor, execute)
+        failed = False
+        return result
+    finally:
+        if finished is not None:
+            record_db_call(query_table(query), started, finished - started, started - submitted, error=failed)
+
+async def gather_queries(*queries):
+    """
+    Execute several Supabase queries concurrently
+    Results come back in the same order as the queries
+    """
+    return await asyncio.gather(*(run_query(query) for query in queries))
+
+# IDs per IN (...) filter, keeps request URLs well under proxy limits
+IN_CHUNK_SIZE = 100
+# Rows per page for multi-page reads; keep at or below PostgREST's max-rows (1000 on Supabase)
+DB_PAGE_SIZE = int(os.getenv("DB_PAGE_SIZE", "1000"))
+
+async def _select_chunk(db, table: str, column: str, chunk, fields: str):
+    """
+    Every row of one IN (...) chunk, a page at a time until a short page
+    PostgREST silently truncates a response at max-rows, so one request is not enough
+    """
+    rows = []
+    while True:
+        query = db.table(table).select(fields).in_(column, chunk).order('id')
+        page = (await run_query(query.range(len(rows), len(rows) + DB_PAGE_SIZE - 1))).data
+        rows += page
+        if len(page) < DB_PAGE_SIZE:
+            return rows
+
+async def select_in(db, table: str, column: str, ids, fields: str = "*"):
+    """
+    select fields where column in ids
+    Large ID lists are split into chunks that run concurrently;
+    each chunk is paged, so matches beyond max-rows are not dropped
+    """
+    ids = list(ids)
+    chunks = [ids[i:i + IN_CHUNK_SIZE] for i in range(0, len(ids), IN_CHUNK_SIZE)]
+    results = await asyncio.gather(*(_select_chunk(db, table, column, chunk, fields) for chunk in chunks))
+    return [row for rows in results for row in rows]
+
+async def select_all(db, table: str, fields: str = "id", **filters):
+    """
+    select fields where column = value for each filter, every matching row
+    Read in keyset pages on id (which fields must include), so listings
+    longer than max-rows are not truncated
+    """
+    rows = []
+    while True:
+        query = db.table(table).select(fields)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        if rows:
+            query = query.gt('id', rows[-1]['id'])
+        page = (await run_query(query.order('id').limit(DB_PAGE_SIZE))).data
+        rows += page
+        if len(page) < DB_PAGE_SIZE:
+            return rows
 
 # Test connection
 def test_connection():
@@ -28,7 +170,7 @@ def test_connection():
     Test if database connection is working
     """
     try:
-        result = supabase.table('projects').select("id").limit(1).execute()
+        result = get_db().table('projects').select("id").limit(1).execute()
         print("✅ Database connection successful!")
         return True
     except Exception as e:
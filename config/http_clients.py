@@ -0,0 +1,146 @@
+"""
+HTTP Client Configuration - pooled, tuned transports for Supabase and Gemini
+"""
+
+import os
+import time
+import threading
+import importlib.util
+
+# Connection pool per client: total sockets, idle sockets kept open, and
+# how long an idle socket is kept before closing it
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# HTTP/2 multiplexes concurrent calls over one connection (needs the h2 package)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") != "0"
+
+# Per-call timeouts in seconds
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "30"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "120"))
+
+# Open connections at startup so the first requests skip DNS and TLS setup
+HTTP_WARMUP = os.getenv("HTTP_WARMUP", "1") != "0"
+
+H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def http2_enabled():
+    return HTTP2_ENABLED and H2_AVAILABLE
+
+
+def http_timeout(read_timeout: float = HTTP_READ_TIMEOUT):
+    """
+    httpx.Timeout with the configured per-phase timeouts
+    """
+    import httpx
+    
+    return httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT,
+        read=read_timeout,
+        write=HTTP_WRITE_TIMEOUT,
+        pool=HTTP_POOL_TIMEOUT
+    )
+
+
+def client_args(read_timeout: float = HTTP_READ_TIMEOUT):
+    """
+    Keyword arguments for httpx.Client with the configured pool and timeouts
+    """
+    import httpx
+    
+    return {
+        "http2": http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        "timeout": http_timeout(read_timeout)
+    }
+
+
+def make_http_client(read_timeout: float = HTTP_READ_TIMEOUT, **kwargs):
+    """
+    New httpx.Client using the configured pool limits, HTTP/2 and timeouts
+    """
+    import httpx
+    
+    return httpx.Client(**{**client_args(read_timeout), **kwargs})
+
+
+class PerWorker:
+    """
+    Lazily built object, rebuilt in each worker process
+
+    Sockets must not be shared across fork(): a client created in the
+    parent (e.g. with gunicorn --preload) is replaced the first time a
+    worker asks for it.
+    """
+
+    def __init__(self, factory, close=None):
+        self.factory = factory
+        self._close = close
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._value = self.factory()
+                    self._pid = pid
+        return self._value
+
+    @property
+    def ready(self):
+        """True once this process has built its instance"""
+        return self._pid == os.getpid()
+
+    def reset(self):
+        """
+        Drop this process's instance, closing its connections
+        """
+        with self._lock:
+            value, owned = self._value, self._pid == os.getpid()
+            self._value = None
+            self._pid = None
+        if owned and value is not None and self._close:
+            try:
+                self._close(value)
+            except Exception as e:
+                print(f"Error closing client: {e}")
+
+
+def warmup(client, url: str, headers: dict = None, connections: int = 1):
+    """
+    Open connections to url ahead of the first real request
+    Any HTTP status counts as success; returns the seconds taken or None on failure
+    """
+    # One connection is enough with HTTP/2; HTTP/1.1 needs one per concurrent call
+    count = 1 if http2_enabled() else max(1, min(connections, HTTP_MAX_KEEPALIVE))
+    errors = []
+
+    def touch():
+        try:
+            client.head(url, headers=headers or {})
+        except Exception as e:
+            errors.append(e)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=touch) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        print(f"Warmup of {url} failed: {errors[0]}")
+        return None
+    return time.perf_counter() - start
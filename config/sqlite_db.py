@@ -0,0 +1,468 @@
+"""
+SQLite Backend - embedded database with the same query interface as Supabase
+Used for local runs without Supabase (DB_BACKEND=sqlite), for tests and as
+the analytics replica (see services/analytics_replica.py).
+
+Supports the query-builder subset the app uses:
+table().select(columns, count=).eq/neq/gt/gte/lt/lte/in_/or_().order().limit()/range().execute()
+plus insert(), upsert(on_conflict=), update() and delete().
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from decimal import Decimal
+from datetime import date, datetime
+
+SCHEMA_SQL = """
+create table if not exists projects (
+    id          text primary key default (lower(hex(randomblob(16)))),
+    title       text,
+    description text,
+    status      text default 'active',
+    start_date  text,
+    end_date    text,
+    created_at  text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+create table if not exists budgets (
+    id          text primary key default (lower(hex(randomblob(16)))),
+    project_id  text not null,
+    dept        text,
+    planned     real default 0,
+    committed   real default 0,
+    actual      real default 0,
+    created_at  text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+create table if not exists schedules (
+    id          text primary key default (lower(hex(randomblob(16)))),
+    project_id  text not null,
+    day         integer,
+    scene       text,
+    location    text,
+    status      text default 'planned',
+    date        text,
+    created_at  text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+create table if not exists pos (
+    id          text primary key default (lower(hex(randomblob(16)))),
+    project_id  text not null,
+    vendor      text,
+    amount      real default 0,
+    status      text default 'draft',
+    created_at  text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+create table if not exists invoices (
+    id          text primary key default (lower(hex(randomblob(16)))),
+    po_id       text not null,
+    amount      real default 0,
+    due_date    text,
+    status      text default 'pending',
+    created_at  text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+create table if not exists crew (
+    id          text primary key default (lower(hex(randomblob(16)))),
+    name        text,
+    role        text,
+    department  text,
+    email       text,
+    phone       text,
+    created_at  text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+create table if not exists events (
+    id           text primary key default (lower(hex(randomblob(16)))),
+    project_id   text,
+    type         text,
+    payload_json text,
+    created_at   text default (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    event_id     text,
+    seq          integer
+);
+
+create table if not exists kpi_snapshots (
+    project_id  text not null,
+    dept        text not null default '',
+    day         text not null,
+    burn_rate   real,
+    cpi         real,
+    spi         real,
+    planned     real,
+    actual      real,
+    variance    real,
+    primary key (project_id, dept, day)
+);
+
+-- Indexes used by every per-project read
+create index if not exists budgets_project_id_idx on budgets (project_id);
+create index if not exists schedules_project_id_idx on schedules (project_id, day);
+create index if not exists pos_project_id_idx on pos (project_id);
+create index if not exists invoices_po_id_idx on invoices (po_id);
+create index if not exists projects_status_idx on projects (status);
+create index if not exists projects_created_at_idx on projects (created_at, id);
+create index if not exists events_created_at_idx on events (created_at);
+
+-- The aggregate views from scripts/setup_db.py
+create view if not exists budget_totals as
+select
+    project_id,
+    count(*)                     as line_count,
+    coalesce(sum(planned), 0)    as total_planned,
+    coalesce(sum(committed), 0)  as total_committed,
+    coalesce(sum(actual), 0)     as total_actual
+from budgets
+group by project_id;
+
+create view if not exists budget_dept_variance as
+select
+    project_id,
+    dept,
+    coalesce(sum(planned), 0)                           as planned,
+    coalesce(sum(committed), 0)                         as committed,
+    coalesce(sum(actual), 0)                            as actual,
+    coalesce(sum(planned), 0) - coalesce(sum(actual), 0) as variance
+from budgets
+group by project_id, dept;
+
+create view if not exists schedule_status_counts as
+select
+    project_id,
+    coalesce(status, 'unknown') as status,
+    count(*)                    as day_count
+from schedules
+group by project_id, coalesce(status, 'unknown');
+
+create view if not exists po_totals as
+select
+    project_id,
+    count(*)                  as total_count,
+    coalesce(sum(amount), 0)  as total_amount
+from pos
+group by project_id;
+"""
+
+# Columns added after their table was first created; added to older files on open
+ADDED_COLUMNS = {"events": (("event_id", "text"), ("seq", "integer"))}
+
+# Runs after ADDED_COLUMNS: events get an increasing seq on insert, like the
+# identity column setup_db.py adds in Postgres
+EVENT_SEQ_SQL = """
+create index if not exists events_seq_idx on events (seq);
+create trigger if not exists events_seq after insert on events when new.seq is null
+begin
+    update events set seq = (select coalesce(max(seq), 0) + 1 from events) where rowid = new.rowid;
+end;
+"""
+
+# Columns stored as JSON text and decoded on read
+JSON_COLUMNS = {"events": ("payload_json",)}
+
+OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _ident(name: str):
+    name = name.strip()
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return f'"{name}"'
+
+
+def _encode(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _split(expr: str):
+    """
+    Split a PostgREST filter list on top-level commas
+    """
+    parts, depth, quoted, escaped, current = [], 0, False, False, ""
+    for ch in expr:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    parts.append(current)
+    return parts
+
+
+def _or_sql(expr: str, joiner: str = " or "):
+    """
+    SQL for an or_() expression, e.g. day.gt.3,and(day.eq.3,id.gt."abc")
+    """
+    clauses, params = [], []
+    for term in _split(expr):
+        if term.startswith("and(") or term.startswith("or("):
+            inner = term[term.index("(") + 1:-1]
+            sql, values = _or_sql(inner, " and " if term.startswith("and(") else " or ")
+        else:
+            column, op, value = term.split(".", 2)
+            if value.startswith('"') and value.endswith('"'):
+                value = value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+            sql, values = f"{_ident(column)} {OPERATORS[op]} ?", [value]
+        clauses.append(sql)
+        params += values
+    return "(" + joiner.join(clauses) + ")", params
+
+
+class SQLiteResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class SQLiteQuery:
+    """
+    One table().select()/insert()/... chain, translated to SQL by execute()
+    """
+
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.columns = "*"
+        self.count = None
+        self.where = []
+        self.params = []
+        self.orders = []
+        self.row_limit = None
+        self.row_offset = 0
+        self.action = "select"
+        self.payload = None
+        self.on_conflict = None
+        self.returning = "representation"
+
+    def select(self, columns: str = "*", count=None, **kwargs):
+        self.columns = columns
+        self.count = count
+        return self
+
+    def _filter(self, column, op, value):
+        self.where.append(f"{_ident(column)} {OPERATORS[op]} ?")
+        self.params.append(_encode(value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        values = [_encode(v) for v in values]
+        if not values:
+            self.where.append("0")
+            return self
+        self.where.append(f"{_ident(column)} in ({', '.join('?' * len(values))})")
+        self.params += values
+        return self
+
+    def or_(self, expr: str):
+        sql, params = _or_sql(expr)
+        self.where.append(sql)
+        self.params += params
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self.orders.append(f"{_ident(column)} {'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, count: int, **kwargs):
+        self.row_limit = int(count)
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self.row_offset, self.row_limit = int(start), int(end) - int(start) + 1
+        return self
+
+    def insert(self, rows, returning: str = "representation", **kwargs):
+        self.action, self.payload, self.returning = "insert", rows, returning
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id", returning: str = "representation", **kwargs):
+        self.action, self.payload, self.returning = "upsert", rows, returning
+        self.on_conflict = [c.strip() for c in on_conflict.split(",")]
+        return self
+
+    def update(self, values, **kwargs):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    def _where_sql(self):
+        return f" where {' and '.join(self.where)}" if self.where else ""
+
+    def execute(self):
+        return self.client.run(getattr(self, f"_{self.action}"))
+
+    def _select(self, conn):
+        columns = "*" if self.columns.strip() == "*" else ", ".join(_ident(c) for c in self.columns.split(","))
+        sql = f"select {columns} from {_ident(self.table)}{self._where_sql()}"
+        if self.orders:
+            sql += f" order by {', '.join(self.orders)}"
+        if self.row_limit is not None:
+            sql += f" limit {self.row_limit}"
+            if self.row_offset:
+                sql += f" offset {self.row_offset}"
+        rows = self.client.decode(self.table, conn.execute(sql, self.params).fetchall())
+
+        total = None
+        if self.count:
+            sql = f"select count(*) from {_ident(self.table)}{self._where_sql()}"
+            total = conn.execute(sql, self.params).fetchone()[0]
+        return SQLiteResponse(rows, total)
+
+    def _write(self, conn, rows, conflict_sql=""):
+        rows = rows if isinstance(rows, list) else [rows]
+        written = []
+        for row in rows:
+            columns = list(row)
+            sql = (
+                f"insert into {_ident(self.table)} ({', '.join(_ident(c) for c in columns)}) "
+                f"values ({', '.join('?' * len(columns))}){conflict_sql(columns) if conflict_sql else ''} returning *"
+            )
+            written += conn.execute(sql, [_encode(row[c]) for c in columns]).fetchall()
+        if self.returning == "minimal":
+            return SQLiteResponse([])
+        return SQLiteResponse(self.client.decode(self.table, written))
+
+    def _insert(self, conn):
+        return self._write(conn, self.payload)
+
+    def _upsert(self, conn):
+        keys = ", ".join(_ident(c) for c in self.on_conflict)
+
+        def conflict_sql(columns):
+            updates = [f"{_ident(c)} = excluded.{_ident(c)}" for c in columns if c not in self.on_conflict]
+            return f" on conflict ({keys}) do " + (f"update set {', '.join(updates)}" if updates else "nothing")
+
+        return self._write(conn, self.payload, conflict_sql)
+
+    def _update(self, conn):
+        columns = list(self.payload)
+        sql = (
+            f"update {_ident(self.table)} set {', '.join(f'{_ident(c)} = ?' for c in columns)}"
+            f"{self._where_sql()} returning *"
+        )
+        rows = conn.execute(sql, [_encode(self.payload[c]) for c in columns] + self.params).fetchall()
+        return SQLiteResponse(self.client.decode(self.table, rows))
+
+    def _delete(self, conn):
+        sql = f"delete from {_ident(self.table)}{self._where_sql()} returning *"
+        return SQLiteResponse(self.client.decode(self.table, conn.execute(sql, self.params).fetchall()))
+
+
+class SQLiteClient:
+    """
+    Supabase-compatible client over one SQLite file (or ":memory:")
+
+    One connection per client, guarded by a lock like the AI result cache;
+    every execute() runs in its own transaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            # Readers don't block the replica sync (or each other) in WAL mode
+            self._conn.execute("pragma journal_mode=wal")
+        self._conn.executescript(SCHEMA_SQL)
+        for table, added in ADDED_COLUMNS.items():
+            existing = {row['name'] for row in self._conn.execute(f"pragma table_info({_ident(table)})")}
+            for column, column_type in added:
+                if column not in existing:
+                    self._conn.execute(f"alter table {_ident(table)} add column {_ident(column)} {column_type}")
+        self._conn.executescript(EVENT_SEQ_SQL)
+        self._lock = threading.Lock()
+        self._columns = {}
+
+    def table(self, name: str):
+        return SQLiteQuery(self, name)
+
+    def run(self, action):
+        """
+        Run action(connection) in one transaction
+        """
+        with self._lock, self._conn:
+            return action(self._conn)
+
+    def decode(self, table: str, rows):
+        json_columns = JSON_COLUMNS.get(table, ())
+        decoded = [dict(row) for row in rows]
+        for row in decoded:
+            for column in json_columns:
+                if isinstance(row.get(column), str):
+                    row[column] = json.loads(row[column])
+        return decoded
+
+    def columns(self, table: str):
+        """
+        Column names of a table
+        """
+        if table not in self._columns:
+            rows = self.run(lambda conn: conn.execute(f"pragma table_info({_ident(table)})").fetchall())
+            self._columns[table] = [row['name'] for row in rows]
+        return self._columns[table]
+
+    def replace_table(self, table: str, rows):
+        """
+        Swap a table's contents for rows in one transaction
+        Columns the local schema doesn't have are dropped
+        """
+        columns = [c for c in self.columns(table) if rows and c in rows[0]]
+        sql = (
+            f"insert into {_ident(table)} ({', '.join(_ident(c) for c in columns)}) "
+            f"values ({', '.join('?' * len(columns))})"
+        )
+
+        def replace(conn):
+            conn.execute(f"delete from {_ident(table)}")
+            if columns:
+                conn.executemany(sql, ([_encode(row.get(c)) for c in columns] for row in rows))
+
+        self.run(replace)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -3,22 +3,92 @@ Main FastAPI Application
 Film Production Management System with Gemini AI
 """
 
-from fastapi import FastAPI
+import time
+
+# Startup timing: module import starts here
+IMPORT_STARTED = time.perf_counter()
+
+import threading
+from datetime import datetime
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-import uvicorn
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (once, for every module)
+import config  # noqa: F401
 
 # Import all route modules (including ai)
 from routes import auth, projects, budget, po, invoice, schedule, crew, reports, ai
+from services.cache import project_cache
+from services.ai_cache import ai_cache
+from services.gemini_ai import gemini_service, gemini_client
+from services.jobs import job_queue
+from services.event_bus import event_writer
+from services.kpi_store import kpi_store, event_tailer
+from services.kpi_snapshots import snapshot_scheduler
+from services.analytics_replica import replica_sync, replica_client
+from config.database import supabase_client, warmup_db
+from config.http_clients import HTTP_WARMUP
+from utils.responses import CompressionMiddleware, FastJSONResponse
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, register_stats, render_metrics
+
+def warmup_clients():
+    """Open Supabase and Gemini connections so the first requests skip the TLS handshake"""
+    for name, warm in (("Supabase", warmup_db), ("Gemini", gemini_service.warmup)):
+        try:
+            seconds = warm()
+        except Exception as e:
+            print(f"Warmup of {name} failed: {e}")
+            continue
+        if seconds is not None:
+            print(f"✅ {name} connections warmed up in {seconds * 1000:.0f} ms")
+
+# Filled in as the app starts; served at /health/stats
+startup_stats = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    
+    # Clients are built lazily on first use; warming up builds them in the
+    # background (including the slow google.genai import) so startup isn't delayed
+    if HTTP_WARMUP:
+        threading.Thread(target=warmup_clients, name="http-warmup", daemon=True).start()
+    # Apply events written by other workers to the KPI store
+    event_tailer.start()
+    # Keep the analytics replica (if configured) refreshed
+    replica_sync.start()
+    # Daily KPI snapshots for trend charts
+    snapshot_scheduler.start()
+    
+    startup_stats.update({
+        "import_ms": round(IMPORT_SECONDS * 1000, 1),
+        "startup_ms": round((time.perf_counter() - started) * 1000, 1),
+        "ready_at": datetime.utcnow().isoformat()
+    })
+    print(f"🚀 Ready: imports {startup_stats['import_ms']} ms, startup {startup_stats['startup_ms']} ms")
+    
+    yield
+    
+    # Let running report jobs finish writing their results
+    job_queue.shutdown(wait=True)
+    # Write out any buffered audit events
+    event_writer.stop()
+    event_tailer.stop()
+    snapshot_scheduler.stop()
+    replica_sync.stop()
+    # Close pooled connections
+    supabase_client.reset()
+    gemini_client.reset()
+    replica_client.reset()
 
 # Create FastAPI app
 app = FastAPI(
     title="Film Production Management API",
     description="Backend API for film production tracking and management with Gemini AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse  # orjson encoding for every JSON endpoint
 )
 
 # CORS middleware - allow frontend to communicate
@@ -30,6 +100,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# brotli / gzip for responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so request latency includes compression
+app.add_middleware(MetricsMiddleware)
+
 # Health check endpoints
 @app.get("/")
 async def root():
@@ -43,6 +119,42 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/stats")
+async def runtime_stats():
+    """Startup timing and counters for the caches, in-flight AI calls, the event writer, the KPI services and the analytics replica"""
+    return {
+        "startup": startup_stats,
+        "project_cache": project_cache.stats(),
+        "ai_cache": ai_cache.stats(),
+        "ai_in_flight": gemini_service.flight.stats(),
+        "event_writer": event_writer.stats(),
+        "kpi_store": kpi_store.stats(),
+        "kpi_snapshots": snapshot_scheduler.stats(),
+        "analytics_replica": replica_sync.stats()
+    }
+
+@app.get("/health/cache")
+async def cache_stats():
+    """Hit/miss counters for the project read cache and the AI result cache (subset of /health/stats)"""
+    return {
+        "project_cache": project_cache.stats(),
+        "ai_cache": ai_cache.stats(),
+        "ai_in_flight": gemini_service.flight.stats()
+    }
+
+# The same counters as gauges on /metrics
+register_stats("project_cache", project_cache.stats)
+register_stats("ai_cache", ai_cache.stats)
+register_stats("ai_in_flight", gemini_service.flight.stats)
+register_stats("event_writer", event_writer.stats)
+register_stats("kpi_store", kpi_store.stats)
+register_stats("analytics_replica", replica_sync.stats)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # Include all route modules
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(projects.router, prefix="/projects", tags=["Projects"])
@@ -54,8 +166,12 @@ app.include_router(crew.router, prefix="/crew", tags=["Crew"])
 app.include_router(reports.router, prefix="/reports", tags=["Reports"])
 app.include_router(ai.router, prefix="/ai", tags=["AI Analysis"])  # AI endpoints
 
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
 # Run the application
 if __name__ == "__main__":
+    import uvicorn
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -1,15 +1,48 @@
-from fastapi import APIRouter, HTTPException
+import os
+import json
+import asyncio
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from config.database import get_db
+from config.database import get_db, select_all, select_in
+from services.kpi_calculator import compute_kpis
+from services.project_bundle import ProjectBundle, get_project_bundle
+from services.ai_features import BUDGET_FEATURE_FIELDS, SCHEDULE_FEATURE_FIELDS
 from services.gemini_ai import gemini_service
+from services.jobs import job_queue
 
 router = APIRouter()
 
+# Projects analysed in parallel by one batch request
+AI_BATCH_CONCURRENCY = int(os.getenv("AI_BATCH_CONCURRENCY", "4"))
+
+def _sse(chunks):
+    """
+    Wrap a text-chunk generator as Server-Sent Events
+    Each chunk is JSON-encoded so newlines survive the framing
+    """
+    try:
+        for text in chunks:
+            yield f"data: {json.dumps(text)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+def _sse_response(chunks):
+    return StreamingResponse(
+        _sse(chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/health")
 async def check_ai_health():
     """Check if Gemini AI is working"""
     try:
-        response = gemini_service.client.models.generate_content(
+        response = await run_in_threadpool(
+            gemini_service.client.models.generate_content,
             model=gemini_service.model,
             contents="Reply with: OK"
         )
@@ -25,16 +58,15 @@ async def check_ai_health():
         }
 
 @router.get("/analyze/budget/{project_id}")
-async def analyze_budget(project_id: str):
+async def analyze_budget(project_id: str, refresh: bool = False, bundle: ProjectBundle = Depends(get_project_bundle)):
     """Get AI analysis of budget"""
     try:
-        db = get_db()
-        budget = db.table('budgets').select("*").eq('project_id', project_id).execute()
+        budget = await bundle.budgets()
         
-        if not budget.data:
+        if not budget:
             raise HTTPException(status_code=404, detail="No budget data")
         
-        analysis = gemini_service.analyze_budget_risk(budget.data)
+        analysis = await run_in_threadpool(gemini_service.analyze_budget_risk, budget, refresh)
         return {"project_id": project_id, "analysis": analysis}
         
     except HTTPException:
@@ -43,16 +75,15 @@ async def analyze_budget(project_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/analyze/schedule/{project_id}")
-async def analyze_schedule(project_id: str):
+async def analyze_schedule(project_id: str, refresh: bool = False, bundle: ProjectBundle = Depends(get_project_bundle)):
     """Get AI analysis of schedule"""
     try:
-        db = get_db()
-        schedule = db.table('schedules').select("*").eq('project_id', project_id).execute()
+        schedule = await bundle.schedules()
         
-        if not schedule.data:
+        if not schedule:
             raise HTTPException(status_code=404, detail="No schedule data")
         
-        analysis = gemini_service.analyze_schedule_risk(schedule.data)
+        analysis = await run_in_threadpool(gemini_service.analyze_schedule_risk, schedule, refresh)
         return {"project_id": project_id, "analysis": analysis}
         
     except HTTPException:
@@ -61,26 +92,25 @@ async def analyze_schedule(project_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/analyze/project/{project_id}")
-async def analyze_project(project_id: str):
+async def analyze_project(project_id: str, refresh: bool = False, bundle: ProjectBundle = Depends(get_project_bundle)):
     """Get comprehensive AI analysis"""
     try:
-        db = get_db()
-        project = db.table('projects').select("*").eq('id', project_id).execute()
-        budget = db.table('budgets').select("*").eq('project_id', project_id).execute()
-        schedule = db.table('schedules').select("*").eq('project_id', project_id).execute()
+        project, budget, schedule = await bundle.load('projects', 'budgets', 'schedules')
         
-        if not project.data or not budget.data or not schedule.data:
+        if not project or not budget or not schedule:
             raise HTTPException(status_code=404, detail="Insufficient data")
         
-        analysis = gemini_service.analyze_project_overall(
-            budget_data=budget.data,
-            schedule_data=schedule.data,
-            project_info=project.data[0]
+        analysis = await run_in_threadpool(
+            gemini_service.analyze_project_overall,
+            budget_data=budget,
+            schedule_data=schedule,
+            project_info=project[0],
+            refresh=refresh
         )
         
         return {
             "project_id": project_id,
-            "project_title": project.data[0].get('title'),
+            "project_title": project[0].get('title'),
             "analysis": analysis
         }
         
@@ -97,47 +127,183 @@ class QuestionRequest(BaseModel):
 async def ask_question(request: QuestionRequest):
     """Ask Gemini AI any question"""
     try:
-        db = get_db()
-        budget = db.table('budgets').select("*").eq('project_id', request.project_id).execute()
-        schedule = db.table('schedules').select("*").eq('project_id', request.project_id).execute()
+        budget, schedule = await ProjectBundle(request.project_id).load('budgets', 'schedules')
         
-        context = {"budget": budget.data, "schedule": schedule.data}
-        answer = gemini_service.ask_question(request.question, context)
+        context = {"budget": budget, "schedule": schedule}
+        prompt = gemini_service.question_prompt(request.question, context)
+        answer = await run_in_threadpool(gemini_service.ask_question, request.question, context, prompt)
         
-        return {"question": request.question, "answer": answer}
+        return {"question": request.question, "answer": answer, "prompt_tokens": prompt.tokens}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _load_report_data(bundle: ProjectBundle):
+    """
+    Rows for an executive report plus the KPIs computed from those same rows
+    """
+    project, budget, schedule, pos = await bundle.load('projects', 'budgets', 'schedules', 'pos')
+    
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    return {
+        "project": project[0],
+        "budget": budget,
+        "schedule": schedule,
+        "purchase_orders": pos,
+        "kpis": compute_kpis(await bundle.dataset())
+    }
+
 @router.get("/report/{project_id}")
-async def generate_report(project_id: str):
+async def generate_report(project_id: str, refresh: bool = False, bundle: ProjectBundle = Depends(get_project_bundle)):
     """Generate AI executive report"""
     try:
-        db = get_db()
-        project = db.table('projects').select("*").eq('id', project_id).execute()
-        budget = db.table('budgets').select("*").eq('project_id', project_id).execute()
-        schedule = db.table('schedules').select("*").eq('project_id', project_id).execute()
-        pos = db.table('pos').select("*").eq('project_id', project_id).execute()
-        
-        if not project.data:
-            raise HTTPException(status_code=404, detail="Project not found")
-        
-        project_data = {
-            "project": project.data[0],
-            "budget": budget.data,
-            "schedule": schedule.data,
-            "purchase_orders": pos.data
-        }
+        project_data = await _load_report_data(bundle)
         
-        report = gemini_service.generate_report(project_data)
+        prompt = gemini_service.report_prompt(project_data)
+        report = await run_in_threadpool(gemini_service.generate_report, project_data, refresh, prompt)
         
         return {
             "project_id": project_id,
-            "project_title": project.data[0].get('title'),
-            "report": report
+            "project_title": project_data['project'].get('title'),
+            "report": report,
+            "prompt_tokens": prompt.tokens
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """Ask Gemini AI a question, streaming the answer as Server-Sent Events"""
+    try:
+        budget, schedule = await ProjectBundle(request.project_id).load('budgets', 'schedules')
+        
+        context = {"budget": budget, "schedule": schedule}
+        return _sse_response(gemini_service.stream_answer(request.question, context))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/report/{project_id}/stream")
+async def generate_report_stream(project_id: str, refresh: bool = False, bundle: ProjectBundle = Depends(get_project_bundle)):
+    """Generate AI executive report, streaming it as Server-Sent Events"""
+    try:
+        project_data = await _load_report_data(bundle)
+        return _sse_response(gemini_service.stream_report(project_data, refresh))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class BatchAnalysisRequest(BaseModel):
+    project_ids: List[str] = []
+    all_active: bool = False
+    refresh: bool = False
+
+def _group_by_project(rows):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(str(row['project_id']), []).append(row)
+    return grouped
+
+@router.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    Comprehensive AI analysis for many projects
+    Streams one NDJSON line per project as each analysis finishes;
+    a failing project reports its error without failing the batch
+    """
+    try:
+        db = get_db()
+        
+        if request.all_active:
+            project_ids = [str(p['id']) for p in await select_all(db, 'projects', status='active')]
+        else:
+            project_ids = list(dict.fromkeys(str(pid) for pid in request.project_ids))
+        
+        if not project_ids:
+            raise HTTPException(status_code=400, detail="Provide project_ids or all_active=true")
+        
+        # Three bulk reads for the whole batch instead of three per project
+        projects, budgets, schedules = await asyncio.gather(
+            select_in(db, 'projects', 'id', project_ids),
+            select_in(db, 'budgets', 'project_id', project_ids, "project_id," + BUDGET_FEATURE_FIELDS),
+            select_in(db, 'schedules', 'project_id', project_ids, "project_id," + SCHEDULE_FEATURE_FIELDS)
+        )
+        projects = {str(p['id']): p for p in projects}
+        budgets = _group_by_project(budgets)
+        schedules = _group_by_project(schedules)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    limiter = asyncio.Semaphore(AI_BATCH_CONCURRENCY)
+    
+    async def analyze_one(project_id):
+        try:
+            project = projects.get(project_id)
+            if not project or not budgets.get(project_id) or not schedules.get(project_id):
+                return {"project_id": project_id, "error": "Insufficient data"}
+            async with limiter:
+                analysis = await run_in_threadpool(
+                    gemini_service.analyze_project_overall,
+                    budget_data=budgets[project_id],
+                    schedule_data=schedules[project_id],
+                    project_info=project,
+                    refresh=request.refresh
+                )
+            return {
+                "project_id": project_id,
+                "project_title": project.get('title'),
+                "analysis": analysis
+            }
+        except Exception as e:
+            return {"project_id": project_id, "error": str(e)}
+    
+    async def results():
+        for finished in asyncio.as_completed([analyze_one(pid) for pid in project_ids]):
+            yield json.dumps(await finished, default=str) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+def _run_report_job(project_data, refresh):
+    """Worker-side body of a report job; a Gemini error fails the job"""
+    prompt = gemini_service.report_prompt(project_data)
+    return {
+        "project_id": project_data['project'].get('id'),
+        "project_title": project_data['project'].get('title'),
+        "report": gemini_service.generate_report(project_data, refresh, prompt, raise_errors=True),
+        "prompt_tokens": prompt.tokens
+    }
+
+@router.post("/report/{project_id}/jobs", status_code=202)
+async def submit_report_job(project_id: str, refresh: bool = False, bundle: ProjectBundle = Depends(get_project_bundle)):
+    """
+    Queue an AI executive report in the background
+    Poll GET /ai/jobs/{job_id} for the result
+    """
+    try:
+        project_data = await _load_report_data(bundle)
+        job_id = await run_in_threadpool(job_queue.submit, "report", _run_report_job, project_data, refresh)
+        
+        return {"job_id": job_id, "status": "queued", "status_url": f"/ai/jobs/{job_id}"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status and result of a background AI job"""
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
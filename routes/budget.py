@@ -4,7 +4,11 @@
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from config.database import get_db
+from config.database import get_db, run_query
+from services.aggregates import get_budget_aggregates, sum_budget
+from services.cache import cached
+from utils.validators import select_fields
+from utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -15,23 +19,43 @@ class BudgetCreate(BaseModel):
     committed: float = 0
     actual: float = 0
 
+# Columns the totals below are computed from
+BUDGET_TOTAL_FIELDS = ("planned", "committed", "actual")
+
+async def _load_budgets(db, project_id: str, columns: str):
+    result = await run_query(db.table('budgets').select(columns).eq('project_id', project_id))
+    return result.data
+
 @router.get("/projects/{project_id}")
-async def get_project_budget(project_id: str):
-    """Get budget for a project"""
+async def get_project_budget(project_id: str, include_rows: bool = True, fields: str = None):
+    """
+    Get budget for a project
+    With include_rows=false only the database-computed totals are returned
+    fields=dept,actual limits the returned row columns (amount columns are always included)
+    """
     try:
         db = get_db()
-        result = db.table('budgets').select("*").eq('project_id', project_id).execute()
         
-        totals = {
-            "planned": sum(float(b['planned']) for b in result.data),
-            "committed": sum(float(b['committed']) for b in result.data),
-            "actual": sum(float(b['actual']) for b in result.data)
-        }
+        if not include_rows:
+            aggregates = await cached(project_id, 'budget_aggregates', lambda: get_budget_aggregates(db, project_id))
+            totals = aggregates['totals']
+            return {
+                "by_department": aggregates['by_department'],
+                "totals": totals,
+                "variance": totals['planned'] - totals['actual']
+            }
+        
+        # Rows are returned anyway, so summing them here is cheapest
+        columns = select_fields('budgets', fields, required=BUDGET_TOTAL_FIELDS)
+        budgets = await cached(project_id, f"budgets:{columns}", lambda: _load_budgets(db, project_id, columns))
+        totals = sum_budget(budgets)
         
-        return {
-            "budgets": result.data,
+        return FastJSONResponse({
+            "budgets": budgets,
             "totals": totals,
             "variance": totals['planned'] - totals['actual']
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
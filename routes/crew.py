@@ -3,20 +3,42 @@
 # ============================================
 
 from fastapi import APIRouter, HTTPException
-from config.database import get_db
+from config.database import get_db, run_query
+from utils.validators import select_fields
+from utils.pagination import DEFAULT_PAGE_SIZE, apply_keyset, clamp_limit, count_option, decode_cursor, paginate
+from utils.responses import FastJSONResponse
 
 router = APIRouter()
 
+# Keyset order: id is unique, so it alone is a stable cursor
+CREW_ORDER = [('id', False)]
+
 @router.get("/")
-async def get_all_crew():
-    """Get all crew members"""
+async def get_all_crew(limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, count: str = "none", fields: str = None):
+    """
+    Get crew members one page at a time
+    Pass next_cursor back as ?cursor= for the following page;
+    count=exact|planned|estimated adds the total on the first page;
+    fields=name,role limits the returned columns (id is always included)
+    """
     try:
         db = get_db()
-        result = db.table('crew').select("*").execute()
-        return {
-            "crew": result.data,
-            "count": len(result.data)
-        }
+        limit = clamp_limit(limit)
+        keyset = decode_cursor(cursor)
+        
+        columns = select_fields('crew', fields, required=[c for c, _ in CREW_ORDER])
+        query = db.table('crew').select(columns, count=None if keyset else count_option(count))
+        query = apply_keyset(query, CREW_ORDER, keyset).limit(limit + 1)
+        result = await run_query(query)
+        
+        crew, next_cursor = paginate(result.data, CREW_ORDER, limit)
+        return FastJSONResponse({
+            "crew": crew,
+            "count": len(crew),
+            "next_cursor": next_cursor,
+            "total": result.count
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-
@@ -2,10 +2,12 @@
 # FILE: routes/invoice.py
 # ============================================
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel
 from datetime import date
-from config.database import get_db
+from config.database import get_db, run_query, select_in
+from services.bulk_ingest import ingest
+from services.event_bus import log_event
 
 router = APIRouter()
 
@@ -22,8 +24,52 @@ async def create_invoice(invoice: InvoiceCreate):
         db = get_db()
         invoice_dict = invoice.dict()
         invoice_dict['due_date'] = str(invoice.due_date)
-        result = db.table('invoices').insert(invoice_dict).execute()
-        return {"invoice": result.data[0]}
+        result = await run_query(db.table('invoices').insert(invoice_dict))
+        created = result.data[0]
+        
+        # Invoices belong to a project through their PO
+        po = await run_query(db.table('pos').select("project_id").eq('id', invoice.po_id))
+        if po.data:
+            log_event(
+                po.data[0]['project_id'],
+                "invoice_created",
+                {"invoice_id": created.get('id'), "po_id": invoice.po_id, "amount": invoice.amount}
+            )
+        
+        return {"invoice": created}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+
+def _prepare_invoice(row):
+    row['due_date'] = str(row['due_date'])
+    return row
+
+async def _invoices_by_project(rows):
+    """Invoices belong to a project through their PO"""
+    db = get_db()
+    pos = await select_in(db, 'pos', 'id', {str(r['po_id']) for r in rows}, "id,project_id")
+    project_of = {str(p['id']): p['project_id'] for p in pos}
+    grouped = {}
+    for row in rows:
+        project_id = project_of.get(str(row['po_id']))
+        if project_id is not None:
+            grouped.setdefault(project_id, []).append(row)
+    return grouped
+
+@router.post("/bulk")
+async def bulk_create_invoices(file: UploadFile = File(...)):
+    """
+    Import invoices from an NDJSON or CSV upload
+    Rows are validated one by one and inserted in batches; bad rows are
+    reported by row number without stopping the import
+    """
+    try:
+        return await ingest(
+            get_db(), file, InvoiceCreate, 'invoices', "invoices_imported",
+            project_ids=_invoices_by_project,
+            summarize=lambda rows: {"count": len(rows), "total_amount": sum(float(r['amount']) for r in rows)},
+            prepare=_prepare_invoice
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
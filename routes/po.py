@@ -2,9 +2,14 @@
 # FILE: routes/po.py
 # ============================================
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel
-from config.database import get_db
+from config.database import get_db, run_query
+from services.aggregates import get_po_aggregates, sum_pos
+from services.bulk_ingest import ingest, group_by_project
+from services.event_bus import log_event
+from utils.validators import select_fields
+from utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -19,23 +24,60 @@ async def create_po(po: POCreate):
     """Create purchase order"""
     try:
         db = get_db()
-        result = db.table('pos').insert(po.dict()).execute()
-        return {"po": result.data[0]}
+        result = await run_query(db.table('pos').insert(po.dict()))
+        created = result.data[0]
+        
+        # Audit trail; also invalidates cached reads for the project
+        log_event(po.project_id, "po_created", {"po_id": created.get('id'), "amount": po.amount})
+        
+        return {"po": created}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@router.post("/bulk")
+async def bulk_create_pos(file: UploadFile = File(...)):
+    """
+    Import purchase orders from an NDJSON or CSV upload
+    Rows are validated one by one and inserted in batches; bad rows are
+    reported by row number without stopping the import
+    """
+    try:
+        return await ingest(
+            get_db(), file, POCreate, 'pos', "pos_imported",
+            project_ids=group_by_project,
+            summarize=lambda rows: {"count": len(rows), "total_amount": sum(float(r['amount']) for r in rows)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
 @router.get("/projects/{project_id}")
-async def get_project_pos(project_id: str):
-    """Get all POs for a project"""
+async def get_project_pos(project_id: str, include_rows: bool = True, fields: str = None):
+    """
+    Get all POs for a project
+    With include_rows=false only the database-computed totals are returned
+    fields=vendor,status limits the returned row columns (amount is always included)
+    """
     try:
         db = get_db()
-        result = db.table('pos').select("*").eq('project_id', project_id).execute()
-        return {
+        
+        if not include_rows:
+            totals = await get_po_aggregates(db, project_id)
+            return {
+                "total_amount": totals['total_amount'],
+                "count": totals['total_count']
+            }
+        
+        columns = select_fields('pos', fields, required=("amount",))
+        result = await run_query(db.table('pos').select(columns).eq('project_id', project_id))
+        totals = sum_pos(result.data)
+        return FastJSONResponse({
             "pos": result.data,
-            "total_amount": sum(float(po['amount']) for po in result.data),
-            "count": len(result.data)
-        }
+            "total_amount": totals['total_amount'],
+            "count": totals['total_count']
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-
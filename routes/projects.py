@@ -2,65 +2,61 @@
 # FILE: routes/projects.py
 # ============================================
 
+import asyncio
 from fastapi import APIRouter, HTTPException
-from config.database import get_db
+from config.database import get_db, run_query
+from services.cache import cached
+from services.kpi_calculator import compute_kpis
+from services.kpi_store import kpi_store
 from services.event_bus import log_event
+from utils.validators import select_fields
+from utils.pagination import DEFAULT_PAGE_SIZE, apply_keyset, clamp_limit, count_option, decode_cursor, paginate
+from utils.responses import FastJSONResponse
 
 router = APIRouter()
 
+async def _load_project(db, project_id: str, columns: str = "*"):
+    result = await run_query(db.table('projects').select(columns).eq('id', project_id))
+    return result.data
+
 @router.get("/{project_id}/summary")
-async def get_project_summary(project_id: str):
+async def get_project_summary(project_id: str, fields: str = None):
     """
     Get comprehensive project summary
+    fields=title,status limits the columns of the embedded project row
     """
     try:
         db = get_db()
+        columns = select_fields('projects', fields)
         
-        # Get project details
-        project = db.table('projects').select("*").eq('id', project_id).execute()
+        # Fetch the project row and the project's KPI dataset concurrently;
+        # the same dataset feeds the budget, schedule and PO sections and the KPIs.
+        # Like the cached project row it is at most KPI_STORE_TTL_SECONDS old
+        # for changes that emit no events (budget edits)
+        project, dataset = await asyncio.gather(
+            cached(project_id, f"projects:{columns}", lambda: _load_project(db, project_id, columns)),
+            kpi_store.get(db, project_id)
+        )
         
-        if not project.data:
+        if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        # Get budget summary
-        budget = db.table('budgets').select("*").eq('project_id', project_id).execute()
-        
-        # Get schedule summary
-        schedule = db.table('schedules').select("*").eq('project_id', project_id).execute()
-        
-        # Get PO summary
-        pos = db.table('pos').select("*").eq('project_id', project_id).execute()
-        
-        # Calculate totals
-        total_planned = sum(float(b['planned']) for b in budget.data) if budget.data else 0
-        total_actual = sum(float(b['actual']) for b in budget.data) if budget.data else 0
-        total_committed = sum(float(b['committed']) for b in budget.data) if budget.data else 0
-        
-        # Count schedules by status
-        schedule_status = {}
-        if schedule.data:
-            for s in schedule.data:
-                status = s.get('status', 'unknown')
-                schedule_status[status] = schedule_status.get(status, 0) + 1
+        budget = dataset['budget']
+        totals = budget['totals']
         
         # Build summary response
         summary = {
-            "project": project.data[0],
+            "project": project[0],
             "budget_summary": {
-                "total_planned": total_planned,
-                "total_committed": total_committed,
-                "total_actual": total_actual,
-                "variance": total_planned - total_actual,
-                "by_department": budget.data
-            },
-            "schedule_summary": {
-                "total_days": len(schedule.data) if schedule.data else 0,
-                "status_breakdown": schedule_status
+                "total_planned": totals['planned'],
+                "total_committed": totals['committed'],
+                "total_actual": totals['actual'],
+                "variance": totals['planned'] - totals['actual'],
+                "by_department": budget['by_department']
             },
-            "purchase_orders": {
-                "total_count": len(pos.data) if pos.data else 0,
-                "total_amount": sum(float(p['amount']) for p in pos.data) if pos.data else 0
-            }
+            "schedule_summary": dataset['schedule'],
+            "purchase_orders": dataset['pos'],
+            "kpis": compute_kpis(dataset)
         }
         
         return summary
@@ -71,13 +67,34 @@ async def get_project_summary(project_id: str):
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+# Newest first; id breaks ties between projects created at the same instant
+PROJECT_ORDER = [('created_at', True), ('id', True)]
+
 @router.get("/")
-async def list_projects():
-    """Get all projects"""
+async def list_projects(limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, count: str = "none", fields: str = None):
+    """
+    Get projects, newest first, one page at a time
+    Pass next_cursor back as ?cursor= for the following page;
+    count=exact|planned|estimated adds the total on the first page;
+    fields=id,title limits the returned columns (sort keys are always included)
+    """
     try:
         db = get_db()
-        result = db.table('projects').select("*").order('created_at', desc=True).execute()
-        return {"projects": result.data}
+        limit = clamp_limit(limit)
+        keyset = decode_cursor(cursor)
+        
+        columns = select_fields('projects', fields, required=[c for c, _ in PROJECT_ORDER])
+        query = db.table('projects').select(columns, count=None if keyset else count_option(count))
+        query = apply_keyset(query, PROJECT_ORDER, keyset).limit(limit + 1)
+        result = await run_query(query)
+        
+        projects, next_cursor = paginate(result.data, PROJECT_ORDER, limit)
+        return FastJSONResponse({
+            "projects": projects,
+            "next_cursor": next_cursor,
+            "total": result.count
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    
\ No newline at end of file
@@ -2,47 +2,127 @@
 # FILE: routes/reports.py
 # ============================================
 
+from datetime import date
 from fastapi import APIRouter, HTTPException
-from config.database import get_db
+from config.database import get_db, select_all
+from services.kpi_store import kpi_store
+from services.kpi_calculator import compute_kpis, report_view
+from services.portfolio_kpis import get_portfolio_kpis
+from services.analytics_replica import get_analytics_db
+from services.kpi_snapshots import TREND_MAX_POINTS, TREND_METRICS, get_trend, take_snapshots
+from utils.responses import FastJSONResponse
 
 router = APIRouter()
 
 @router.get("/kpis")
 async def get_kpis(project_id: str = None):
-    """Get KPI metrics"""
+    """
+    Get KPI metrics
+    burn_rate here is a ratio (0.8 = 80% spent); calculate_kpis reports it as a percentage
+    """
     try:
         db = get_db()
         
         if not project_id:
             return {"message": "Please provide project_id parameter"}
         
-        # Get budget data
-        budgets = db.table('budgets').select("*").eq('project_id', project_id).execute()
+        kpis = compute_kpis(await kpi_store.get(db, project_id))
         
-        if not budgets.data:
+        if kpis is None:
             return {"message": "No budget data found"}
         
-        # Calculate metrics
-        total_planned = sum(float(b['planned']) for b in budgets.data)
-        total_actual = sum(float(b['actual']) for b in budgets.data)
+        return report_view(kpis)
         
-        burn_rate = total_actual / total_planned if total_planned > 0 else 0
-        variance = total_planned - total_actual
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@router.post("/kpis/rebuild")
+async def rebuild_kpis(project_id: str = None):
+    """
+    Recompute KPI inputs from the database
+    Rebuilds one project, or every project the store holds when project_id is omitted
+    """
+    try:
+        rebuilt = await kpi_store.rebuild(get_db(), project_id)
+        return {"rebuilt": rebuilt}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@router.get("/kpis/portfolio")
+async def get_portfolio(project_ids: str = None, status: str = "active", departments: bool = True):
+    """
+    KPI metrics for many projects at once
+    project_ids=a,b,c selects projects explicitly; otherwise every project
+    with the given status is included. departments=false skips the
+    per-department breakdown for large portfolios
+    Reads come from the analytics replica when one is configured
+    """
+    try:
+        db = get_analytics_db()
+        
+        if project_ids:
+            ids = [pid.strip() for pid in project_ids.split(",") if pid.strip()]
+        else:
+            ids = [str(p['id']) for p in await select_all(db, 'projects', status=status)]
+        
+        if not ids:
+            return {"message": "No projects found"}
+        
+        return FastJSONResponse(await get_portfolio_kpis(db, ids, include_departments=departments))
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@router.post("/kpis/snapshots")
+async def create_snapshots(project_ids: str = None):
+    """
+    Store today's KPIs now instead of waiting for the scheduled run
+    """
+    try:
+        ids = [pid.strip() for pid in project_ids.split(",") if pid.strip()] if project_ids else None
+        return await take_snapshots(get_db(), ids, source=get_analytics_db())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+def _parse_day(name: str, value: str = None):
+    """ISO date query parameter, normalized to YYYY-MM-DD; 400 if it isn't a date"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date (YYYY-MM-DD), got {value!r}")
+
+
+@router.get("/kpis/trend/{project_id}")
+async def get_kpi_trend(project_id: str, metrics: str = "burn_rate,cpi,spi", start: str = None, end: str = None,
+                        dept: str = None, points: int = TREND_MAX_POINTS):
+    """
+    KPI history from the daily snapshots
+    start/end are ISO dates; long ranges are averaged down to at most points entries;
+    dept selects one department instead of the project totals
+    """
+    try:
+        selected = [m.strip() for m in metrics.split(",") if m.strip()]
+        unknown = [m for m in selected if m not in TREND_METRICS]
+        if not selected or unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown metrics: {', '.join(unknown)}. Allowed: {', '.join(TREND_METRICS)}"
+            )
         
-        # Variance by department
-        variance_by_dept = {}
-        for b in budgets.data:
-            dept = b['dept']
-            variance_by_dept[dept] = float(b['planned']) - float(b['actual'])
+        start, end = _parse_day("start", start), _parse_day("end", end)
+        if start and end and start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
         
-        return {
-            "burn_rate": round(burn_rate, 2),
-            "total_planned": total_planned,
-            "total_actual": total_actual,
-            "variance": variance,
-            "variance_by_dept": variance_by_dept,
-            "CPI": round(total_planned / total_actual, 2) if total_actual > 0 else 0
-        }
+        points = max(1, min(points, TREND_MAX_POINTS))
+        return await get_trend(get_db(), project_id, selected, start, end, dept or "", points)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
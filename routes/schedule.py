@@ -2,9 +2,17 @@
 # FILE: routes/schedule.py
 # ============================================
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel
-from config.database import get_db
+from config.database import get_db, run_query
+from services.aggregates import get_schedule_aggregates
+from services.bulk_ingest import ingest, group_by_project
+from services.cache import cached
+from services.event_bus import log_event
+from utils.validators import select_fields
+from utils.pagination import DEFAULT_PAGE_SIZE, apply_keyset, clamp_limit, decode_cursor, paginate
+from utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -15,23 +23,95 @@ class ScheduleCreate(BaseModel):
     location: str
     status: str = "planned"
 
+class ScheduleStatusUpdate(BaseModel):
+    status: str
+
+# Shooting order; id breaks ties when a day has several entries
+SCHEDULE_ORDER = [('day', False), ('id', False)]
+
+async def _load_schedule_page(db, project_id: str, keyset, limit: int, columns: str):
+    query = db.table('schedules').select(columns).eq('project_id', project_id)
+    query = apply_keyset(query, SCHEDULE_ORDER, keyset).limit(limit + 1)
+    result = await run_query(query)
+    return paginate(result.data, SCHEDULE_ORDER, limit)
+
 @router.get("/projects/{project_id}")
-async def get_project_schedule(project_id: str):
-    """Get schedule for a project"""
+async def get_project_schedule(project_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, fields: str = None):
+    """
+    Get schedule for a project one page at a time
+    total_days and status_breakdown always cover the whole schedule;
+    fields=day,scene limits the returned columns (sort keys are always included)
+    """
     try:
         db = get_db()
-        result = db.table('schedules').select("*").eq('project_id', project_id).order('day').execute()
+        limit = clamp_limit(limit)
+        keyset = decode_cursor(cursor)
         
-        status_count = {}
-        for item in result.data:
-            status = item.get('status', 'unknown')
-            status_count[status] = status_count.get(status, 0) + 1
+        columns = select_fields('schedules', fields, required=[c for c, _ in SCHEDULE_ORDER])
         
-        return {
-            "schedule": result.data,
-            "total_days": len(result.data),
-            "status_breakdown": status_count
-        }
+        page_key = f"schedules:{columns}:{cursor or ''}:{limit}"
+        (schedule, next_cursor), stats = await asyncio.gather(
+            cached(project_id, page_key, lambda: _load_schedule_page(db, project_id, keyset, limit, columns)),
+            cached(project_id, 'schedule_aggregates', lambda: get_schedule_aggregates(db, project_id))
+        )
+        
+        return FastJSONResponse({
+            "schedule": schedule,
+            "next_cursor": next_cursor,
+            "total_days": stats['total_days'],
+            "status_breakdown": stats['status_breakdown']
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@router.patch("/{schedule_id}")
+async def update_schedule_status(schedule_id: str, update: ScheduleStatusUpdate):
+    """
+    Change the status of a schedule day
+    """
+    try:
+        db = get_db()
+        
+        current = await run_query(db.table('schedules').select("project_id,status").eq('id', schedule_id))
+        if not current.data:
+            raise HTTPException(status_code=404, detail="Schedule entry not found")
+        
+        previous = current.data[0]
+        result = await run_query(db.table('schedules').update({"status": update.status}).eq('id', schedule_id))
+        
+        if previous['status'] != update.status:
+            log_event(
+                previous['project_id'],
+                "schedule_status_changed",
+                {"schedule_id": schedule_id, "from": previous['status'], "to": update.status}
+            )
+        
+        return {"message": "Schedule updated successfully", "data": result.data}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+def _summarize_days(rows):
+    status_count = {}
+    for row in rows:
+        status_count[row['status']] = status_count.get(row['status'], 0) + 1
+    return {"count": len(rows), "status_breakdown": status_count}
+
+@router.post("/bulk")
+async def bulk_create_schedule(file: UploadFile = File(...)):
+    """
+    Import schedule days from an NDJSON or CSV upload
+    Rows are validated one by one and inserted in batches; bad rows are
+    reported by row number without stopping the import
+    """
+    try:
+        return await ingest(
+            get_db(), file, ScheduleCreate, 'schedules', "schedule_imported",
+            project_ids=group_by_project,
+            summarize=_summarize_days
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
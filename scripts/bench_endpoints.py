@@ -0,0 +1,226 @@
+"""
+Endpoint Benchmark - latency and throughput without Supabase or Gemini
+Requests go through the full app in-process; the database and Gemini are
+the in-memory stand-ins from scripts/fakes.py, with simulated latency.
+
+    python scripts/bench_endpoints.py                           # prints a table
+    python scripts/bench_endpoints.py --out bench.json          # also writes JSON
+    python scripts/bench_endpoints.py --compare bench.json      # diff against an earlier run
+    python scripts/bench_endpoints.py --sizes 100,1000 --db-latency 5 --gemini-latency 300 --cold
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Placeholder credentials, and no background pollers or network warmup;
+# set before the app modules read their configuration
+BENCH_ENV = {
+    "SUPABASE_URL": "https://example.supabase.co",
+    "SUPABASE_KEY": "benchmark",
+    "GEMINI_API_KEY": "benchmark",
+    "HTTP_WARMUP": "0",
+    "KPI_EVENT_POLL_INTERVAL": "0",
+    "KPI_SNAPSHOT_TIME": "",
+    "AI_CACHE_PATH": ":memory:"
+}
+for name, value in BENCH_ENV.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+from fakes import FakeSupabase, FakeGemini, generate_dataset, install
+
+# AI analyses pass refresh=true so every request reaches (fake) Gemini
+ENDPOINTS = {
+    "summary": "/projects/{id}/summary",
+    "kpis": "/reports/kpis?project_id={id}",
+    "budget": "/budget/projects/{id}",
+    "ai_budget": "/ai/analyze/budget/{id}?refresh=true",
+    "ai_schedule": "/ai/analyze/schedule/{id}?refresh=true",
+    "ai_project": "/ai/analyze/project/{id}?refresh=true",
+}
+
+
+def percentile(values, q: float):
+    """
+    Nearest-rank percentile of a list of numbers
+    """
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def reset_caches():
+    """
+    Forget cached project rows and KPI state, so the next request loads from the database
+    """
+    from services.cache import project_cache
+    from services.kpi_store import kpi_store
+
+    project_cache.clear()
+    kpi_store.clear()
+
+
+async def run_endpoint(client, path: str, project_ids, requests: int, concurrency: int, cold: bool):
+    """
+    Send `requests` requests, `concurrency` at a time, cycling through the projects
+    Returns per-request latencies in seconds, the error count and the wall time
+    """
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        url = path.format(id=project_ids[i % len(project_ids)])
+        async with semaphore:
+            if cold:
+                reset_caches()
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400 or "error" in response.text[:200]:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def bench_size(size: int, args):
+    """
+    Benchmark every selected endpoint against a dataset of `size` budget lines per project
+    """
+    from main import app
+
+    tables = generate_dataset(
+        projects=args.projects, budget_lines=size, schedule_days=max(30, size // 5), pos=max(10, size // 4)
+    )
+    db = FakeSupabase(tables, latency=args.db_latency / 1000)
+    gemini = FakeGemini(latency=args.gemini_latency / 1000, jitter=args.gemini_latency / 4000)
+    install(db=db, gemini=gemini)
+    reset_caches()
+    project_ids = [p['id'] for p in tables['projects']]
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in args.endpoints:
+            path = ENDPOINTS[name]
+            requests = args.ai_requests if name.startswith("ai_") else args.requests
+            await run_endpoint(client, path, project_ids, args.warmup, 1, args.cold)
+
+            db_calls, gemini_calls = db.call_count, gemini.calls
+            latencies, errors, wall = await run_endpoint(
+                client, path, project_ids, requests, args.concurrency, args.cold
+            )
+            ms = [t * 1000 for t in latencies]
+            results.append({
+                "endpoint": name,
+                "path": path,
+                "size": size,
+                "requests": requests,
+                "errors": errors,
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p99_ms": round(percentile(ms, 99), 2),
+                "mean_ms": round(sum(ms) / len(ms), 2),
+                "max_ms": round(max(ms), 2),
+                "throughput_rps": round(requests / wall, 1),
+                "db_calls_per_request": round((db.call_count - db_calls) / requests, 2),
+                "gemini_calls_per_request": round((gemini.calls - gemini_calls) / requests, 2)
+            })
+    return results
+
+
+def compare(results, config: dict, baseline_path: str):
+    """
+    Print the change in p50 / p99 / throughput against an earlier results file
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['endpoint'], r['size']): r for r in baseline['results']}
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "-"
+
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')})")
+    if baseline.get('config') != config:
+        print(f"⚠️  settings differ from this run: {baseline.get('config')}")
+    print(f"{'endpoint':12} {'size':>6} {'p50':>9} {'p99':>9} {'rps':>9}")
+    for r in results:
+        old = previous.get((r['endpoint'], r['size']))
+        if old is None:
+            continue
+        print(f"{r['endpoint']:12} {r['size']:6d} {change(r['p50_ms'], old['p50_ms']):>9} "
+              f"{change(r['p99_ms'], old['p99_ms']):>9} {change(r['throughput_rps'], old['throughput_rps']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,500,5000", help="budget lines per project, comma separated")
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"any of {', '.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and size")
+    parser.add_argument("--ai-requests", type=int, default=40, help="requests per AI endpoint and size")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests before each run")
+    parser.add_argument("--db-latency", type=float, default=5, help="ms per Supabase round trip")
+    parser.add_argument("--gemini-latency", type=float, default=400, help="ms per Gemini call")
+    parser.add_argument("--cold", action="store_true", help="clear the project and KPI caches before every request")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = [e for e in args.endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        results += asyncio.run(bench_size(size, args))
+
+    print(f"{'endpoint':12} {'size':>6} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'db/req':>7} {'errors':>6}")
+    for r in results:
+        print(f"{r['endpoint']:12} {r['size']:6d} {r['p50_ms']:9.2f} {r['p99_ms']:9.2f} "
+              f"{r['throughput_rps']:8.1f} {r['db_calls_per_request']:7.2f} {r['errors']:6d}")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "projects": args.projects,
+            "requests": args.requests,
+            "ai_requests": args.ai_requests,
+            "concurrency": args.concurrency,
+            "db_latency_ms": args.db_latency,
+            "gemini_latency_ms": args.gemini_latency,
+            "cold": args.cold
+        },
+        "results": results
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, report['config'], args.compare)
+
+
+if __name__ == "__main__":
+    main()
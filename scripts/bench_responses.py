@@ -0,0 +1,143 @@
+"""
+Response Benchmark - JSON encode time and bytes on the wire
+Uses payloads shaped like the largest endpoints; no database needed.
+
+    python scripts/bench_responses.py               # prints a table
+    python scripts/bench_responses.py --out bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from utils.responses import FastJSONResponse, _Compressor, brotli, orjson
+
+DEPTS = ["camera", "sound", "art", "costume", "grip", "electric", "locations", "catering", "transport", "post"]
+
+
+def budget_rows(count):
+    return [
+        {"id": i, "project_id": "p1", "dept": DEPTS[i % len(DEPTS)],
+         "planned": round(random.uniform(1000, 50000), 2), "committed": round(random.uniform(0, 40000), 2),
+         "actual": round(random.uniform(0, 45000), 2)}
+        for i in range(count)
+    ]
+
+
+def crew_page(count):
+    return {
+        "crew": [
+            {"id": i, "name": f"Crew Member {i}", "role": "Grip", "department": DEPTS[i % len(DEPTS)],
+             "email": f"crew{i}@example.com", "phone": f"+1-555-{i:04d}"}
+            for i in range(count)
+        ],
+        "count": count,
+        "next_cursor": "eyJpZCI6MjAwfQ",
+        "total": None
+    }
+
+
+def project_summary():
+    from services.kpi_calculator import compute_kpis, dataset_from_rows
+    rows = budget_rows(500)
+    schedule = [{"status": random.choice(["completed", "delayed", "planned"])} for _ in range(120)]
+    dataset = dataset_from_rows(rows, schedule, [{"amount": 10.0}] * 80)
+    return {
+        "project": {"id": "p1", "title": "Feature Film", "status": "active", "created_at": "2024-01-01T00:00:00"},
+        "budget_summary": {**dataset['budget']['totals'], "by_department": dataset['budget']['by_department']},
+        "schedule_summary": dataset['schedule'],
+        "purchase_orders": dataset['pos'],
+        "kpis": compute_kpis(dataset)
+    }
+
+
+def portfolio(projects):
+    from services.portfolio_kpis import budget_frame, schedule_frame, compute_portfolio
+    budgets, schedules = [], []
+    for p in range(projects):
+        budgets += [{**b, "project_id": f"p{p}"} for b in budget_rows(len(DEPTS))]
+        schedules += [{"project_id": f"p{p}", "status": random.choice(["completed", "delayed", "planned"])}
+                      for _ in range(30)]
+    return compute_portfolio(budget_frame(budgets), schedule_frame(schedules))
+
+
+PAYLOADS = {
+    "GET /budget/projects/{id} (2000 rows)": lambda: {"budgets": budget_rows(2000), "total_planned": 1.0},
+    "GET /crew (200 rows)": lambda: crew_page(200),
+    "GET /projects/{id}/summary": project_summary,
+    "GET /reports/kpis/portfolio (1000 projects)": lambda: portfolio(1000),
+}
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times) * 1000
+
+
+def bench(name, payload, repeat):
+    content = jsonable_encoder(payload)
+    _, encoder_ms = timed(lambda: jsonable_encoder(payload), repeat)
+    stdlib_body, stdlib_ms = timed(lambda: JSONResponse(content).body, repeat)
+    fast_body, fast_ms = timed(lambda: FastJSONResponse(content).body, repeat)
+    gzip_body, gzip_ms = timed(lambda: _Compressor("gzip").finish(fast_body), repeat)
+
+    result = {
+        "endpoint": name,
+        # FastAPI runs jsonable_encoder before render() unless the route returns a Response itself
+        "encode_ms": {
+            "default": round(encoder_ms + stdlib_ms, 2),
+            "jsonable_encoder": round(encoder_ms, 2),
+            "json": round(stdlib_ms, 2),
+            "orjson": round(fast_ms, 2)
+        },
+        "bytes": {"json": len(stdlib_body), "orjson": len(fast_body), "gzip": len(gzip_body)},
+        "compress_ms": {"gzip": round(gzip_ms, 2)}
+    }
+    if brotli is not None:
+        br_body, br_ms = timed(lambda: _Compressor("br").finish(fast_body), repeat)
+        result["bytes"]["br"] = len(br_body)
+        result["compress_ms"]["br"] = round(br_ms, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    random.seed(7)
+    if orjson is None:
+        print("⚠️  orjson not installed - FastJSONResponse falls back to the standard encoder")
+
+    results = [bench(name, build(), args.repeat) for name, build in PAYLOADS.items()]
+
+    print(f"{'endpoint':46} {'default ms':>10} {'orjson ms':>9} {'bytes':>9} {'gzip':>8} {'gzip ms':>8} {'br':>8}")
+    for r in results:
+        print(f"{r['endpoint']:46} {r['encode_ms']['default']:10.2f} {r['encode_ms']['orjson']:9.2f} "
+              f"{r['bytes']['orjson']:9d} {r['bytes']['gzip']:8d} {r['compress_ms']['gzip']:8.2f} "
+              f"{r['bytes'].get('br', '-'):>8}")
+    print("default = jsonable_encoder + json.dumps (FastAPI's usual path); "
+          "orjson = FastJSONResponse returned directly by the route")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+"""
+Local stand-ins for Supabase and Gemini - used by the offline benchmarks
+No network access or credentials needed.
+
+    from fakes import FakeSupabase, FakeGemini, generate_dataset, install
+    install(db=FakeSupabase(generate_dataset(projects=10)), gemini=FakeGemini(latency=0.2))
+"""
+
+import os
+import copy
+import json
+import time
+import random
+import threading
+from datetime import date, timedelta
+
+DEPTS = ["camera", "sound", "art", "costume", "grip", "electric", "locations", "catering", "transport", "post"]
+STATUSES = ["completed", "completed", "planned", "planned", "delayed"]
+TABLES = ["projects", "budgets", "schedules", "pos", "invoices", "crew", "events", "kpi_snapshots"]
+
+
+# ----- Supabase -----
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _split(expr: str):
+    """
+    Split a PostgREST filter list on top-level commas
+    """
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    parts.append(current)
+    return parts
+
+
+def _coerce(value, like):
+    if isinstance(like, bool):
+        return value in ("true", True)
+    if isinstance(like, (int, float)):
+        try:
+            return type(like)(value)
+        except (TypeError, ValueError):
+            return value
+    return value
+
+
+OPERATORS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+}
+
+
+def _or_filter(expr: str):
+    """
+    Predicate for an or_() expression such as
+    created_at.lt."2024-01-01",and(created_at.eq."2024-01-01",id.lt.5)
+    """
+    def term(row, text):
+        if text.startswith("and("):
+            return all(term(row, part) for part in _split(text[4:-1]))
+        if text.startswith("or("):
+            return any(term(row, part) for part in _split(text[3:-1]))
+        column, op, value = text.split(".", 2)
+        current = row.get(column)
+        return OPERATORS[op](current, _coerce(value.strip('"'), current))
+
+    parts = _split(expr)
+    return lambda row: any(term(row, part) for part in parts)
+
+
+class FakeQuery:
+    """
+    One table().select()/insert()/... chain, run by execute()
+    """
+
+    def __init__(self, db, table: str):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.equals = {}
+        self.orders = []
+        self.row_limit = None
+        self.row_offset = 0
+        self.columns = "*"
+        self.count = None
+        self.action = "select"
+        self.payload = None
+        self.on_conflict = None
+
+    def select(self, columns: str = "*", count=None, **kwargs):
+        self.columns = columns
+        self.count = count
+        return self
+
+    def _filter(self, column, op, value):
+        self.filters.append(lambda row: OPERATORS[op](row.get(column), _coerce(value, row.get(column))))
+        return self
+
+    def eq(self, column, value):
+        self.equals[column] = value
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        values = {str(v) for v in values}
+        self.filters.append(lambda row: str(row.get(column)) in values)
+        return self
+
+    def or_(self, expr: str):
+        self.filters.append(_or_filter(expr))
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int, **kwargs):
+        self.row_limit = count
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id", **kwargs):
+        self.action, self.payload = "upsert", rows
+        self.on_conflict = [c.strip() for c in on_conflict.split(",")]
+        return self
+
+    def update(self, values, **kwargs):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    def _matches(self, row):
+        return all(f(row) for f in self.filters)
+
+    def _project(self, rows):
+        if self.columns.strip() == "*":
+            return [dict(row) for row in rows]
+        columns = [c.strip() for c in self.columns.split(",")]
+        return [{c: row.get(c) for c in columns} for row in rows]
+
+    def execute(self):
+        self.db._record(self.table)
+        with self.db.lock:
+            if self.action != "select":
+                self.db.changed()
+            return getattr(self, f"_{self.action}")()
+
+    def _select(self):
+        if "project_id" in self.equals:
+            rows = self.db.rows_for(self.table, "project_id", self.equals["project_id"])
+        else:
+            rows = self.db.rows(self.table)
+        rows = [row for row in rows if self._matches(row)]
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        total = len(rows)
+        limit = self.row_limit
+        if self.db.max_rows is not None:
+            limit = self.db.max_rows if limit is None else min(limit, self.db.max_rows)
+        rows = rows[self.row_offset:]
+        if limit is not None:
+            rows = rows[:limit]
+        return FakeResponse(self._project(rows), total if self.count else None)
+
+    def _insert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        inserted = [self.db.add(self.table, row) for row in rows]
+        return FakeResponse(copy.deepcopy(inserted))
+
+    def _upsert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        table = self.db.table_rows(self.table)
+        for row in rows:
+            key = [row.get(c) for c in self.on_conflict]
+            table[:] = [r for r in table if [r.get(c) for c in self.on_conflict] != key]
+        return FakeResponse(copy.deepcopy([self.db.add(self.table, row) for row in rows]))
+
+    def _update(self):
+        updated = []
+        for row in self.db.table_rows(self.table):
+            if self._matches(row):
+                row.update(self.payload)
+                updated.append(copy.deepcopy(row))
+        return FakeResponse(updated)
+
+    def _delete(self):
+        table = self.db.table_rows(self.table)
+        deleted = [row for row in table if self._matches(row)]
+        table[:] = [row for row in table if not self._matches(row)]
+        return FakeResponse(deleted)
+
+
+class FakeSupabase:
+    """
+    In-memory Supabase client: the table().select().eq().order().execute()
+    chain used through get_db(), plus the aggregate views from setup_db.py
+
+    Every execute() sleeps `latency` seconds (one PostgREST round trip)
+    and is counted in `calls`. max_rows caps every select like PostgREST's
+    max-rows setting (Supabase's default is 1000).
+    """
+
+    def __init__(self, tables: dict = None, latency: float = 0.0, max_rows: int = None):
+        self.tables = {name: [] for name in TABLES}
+        self.tables.update(copy.deepcopy(tables or {}))
+        self.latency = latency
+        self.max_rows = max_rows
+        self.lock = threading.RLock()
+        self.calls = {}
+        self._ids = {name: len(rows) for name, rows in self.tables.items()}
+        self._indexes = {}  # (table, column) -> {value: rows}, dropped on every write
+        self.views = {
+            "budget_totals": self._budget_totals,
+            "budget_dept_variance": self._budget_dept_variance,
+            "schedule_status_counts": self._schedule_status_counts,
+            "po_totals": self._po_totals,
+        }
+
+    def table(self, name: str):
+        return FakeQuery(self, name)
+
+    def _record(self, table: str):
+        with self.lock:
+            self.calls[table] = self.calls.get(table, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def call_count(self):
+        return sum(self.calls.values())
+
+    def table_rows(self, name: str):
+        if name not in self.tables:
+            raise Exception(f'relation "public.{name}" does not exist')
+        return self.tables[name]
+
+    def changed(self):
+        self._indexes.clear()
+
+    def rows(self, name: str):
+        if name in self.views:
+            return self.views[name]()
+        return self.table_rows(name)
+
+    def rows_for(self, name: str, column: str, value):
+        """
+        Rows where column == value, through an index like the real tables have
+        """
+        index = self._indexes.get((name, column))
+        if index is None:
+            index = {}
+            for row in self.rows(name):
+                index.setdefault(str(row.get(column)), []).append(row)
+            self._indexes[(name, column)] = index
+        return index.get(str(value), [])
+
+    def add(self, table: str, row: dict):
+        row = dict(row)
+        if "id" not in row and table != "kpi_snapshots":
+            self._ids[table] = self._ids.get(table, 0) + 1
+            row["id"] = self._ids[table]
+        if table == "events" and row.get("seq") is None:
+            self._ids["events.seq"] = self._ids.get("events.seq", 0) + 1
+            row["seq"] = self._ids["events.seq"]
+        self.table_rows(table).append(row)
+        return row
+
+    # Aggregate views, computed on read like the Postgres views
+
+    def _group(self, table: str, *keys):
+        groups = {}
+        for row in self.table_rows(table):
+            groups.setdefault(tuple(row.get(k) for k in keys), []).append(row)
+        return groups
+
+    def _budget_totals(self):
+        return [
+            {
+                "project_id": project_id,
+                "line_count": len(rows),
+                "total_planned": sum(float(r['planned']) for r in rows),
+                "total_committed": sum(float(r['committed']) for r in rows),
+                "total_actual": sum(float(r['actual']) for r in rows)
+            }
+            for (project_id,), rows in self._group("budgets", "project_id").items()
+        ]
+
+    def _budget_dept_variance(self):
+        views = []
+        for (project_id, dept), rows in self._group("budgets", "project_id", "dept").items():
+            planned = sum(float(r['planned']) for r in rows)
+            actual = sum(float(r['actual']) for r in rows)
+            views.append({
+                "project_id": project_id,
+                "dept": dept,
+                "planned": planned,
+                "committed": sum(float(r['committed']) for r in rows),
+                "actual": actual,
+                "variance": planned - actual
+            })
+        return views
+
+    def _schedule_status_counts(self):
+        counts = {}
+        for row in self.table_rows("schedules"):
+            key = (row.get('project_id'), row.get('status') or 'unknown')
+            counts[key] = counts.get(key, 0) + 1
+        return [{"project_id": p, "status": s, "day_count": n} for (p, s), n in counts.items()]
+
+    def _po_totals(self):
+        return [
+            {
+                "project_id": project_id,
+                "total_count": len(rows),
+                "total_amount": sum(float(r['amount']) for r in rows)
+            }
+            for (project_id,), rows in self._group("pos", "project_id").items()
+        ]
+
+
+def generate_dataset(projects: int = 10, budget_lines: int = 100, schedule_days: int = 60,
+                     pos: int = 50, crew: int = 200, seed: int = 7):
+    """
+    Tables for `projects` projects, each with the given number of
+    budget lines, schedule days and purchase orders
+    """
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    tables = {name: [] for name in TABLES}
+
+    for p in range(1, projects + 1):
+        project_id = f"p{p}"
+        tables["projects"].append({
+            "id": project_id, "title": f"Feature Film {p}", "description": "Benchmark project",
+            "status": "active", "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=schedule_days)).isoformat(),
+            "created_at": f"{start + timedelta(days=p % 365)}T00:00:00"
+        })
+        for i in range(budget_lines):
+            planned = round(rng.uniform(1000, 50000), 2)
+            tables["budgets"].append({
+                "id": len(tables["budgets"]) + 1, "project_id": project_id, "dept": DEPTS[i % len(DEPTS)],
+                "planned": planned, "committed": round(planned * rng.uniform(0.3, 1.1), 2),
+                "actual": round(planned * rng.uniform(0.1, 1.2), 2)
+            })
+        for day in range(1, schedule_days + 1):
+            tables["schedules"].append({
+                "id": len(tables["schedules"]) + 1, "project_id": project_id, "day": day,
+                "scene": f"Scene {day}", "location": f"Stage {day % 5 + 1}",
+                "status": rng.choice(STATUSES), "date": (start + timedelta(days=day)).isoformat()
+            })
+        for i in range(pos):
+            po_id = len(tables["pos"]) + 1
+            tables["pos"].append({
+                "id": po_id, "project_id": project_id, "vendor": f"Vendor {i % 20}",
+                "amount": round(rng.uniform(100, 20000), 2), "status": rng.choice(["draft", "approved", "paid"])
+            })
+            if i % 2 == 0:
+                tables["invoices"].append({
+                    "id": len(tables["invoices"]) + 1, "po_id": po_id,
+                    "amount": round(rng.uniform(100, 20000), 2), "status": "received"
+                })
+
+    for i in range(1, crew + 1):
+        tables["crew"].append({
+            "id": i, "name": f"Crew Member {i}", "role": "Grip", "department": DEPTS[i % len(DEPTS)],
+            "email": f"crew{i}@example.com", "phone": f"+1-555-{i:04d}"
+        })
+    return tables
+
+
+# ----- Gemini -----
+
+class FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModels:
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model: str, contents, **kwargs):
+        self.client._record()
+        time.sleep(self.client.delay())
+        return FakeGeminiResponse(self.client.answer(contents))
+
+    def generate_content_stream(self, model: str, contents, **kwargs):
+        self.client._record()
+        text = self.client.answer(contents)
+        chunks = [text[i:i + 80] for i in range(0, len(text), 80)] or [""]
+        delay = self.client.delay() / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield FakeGeminiResponse(chunk)
+
+
+class FakeGemini:
+    """
+    Gemini client stand-in with configurable latency
+
+    Prompts that end with a JSON template ("Respond ONLY with valid JSON in
+    this exact format") get that template back, so the services parse the
+    answer exactly as they would a real one; other prompts get plain text.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self.models = FakeModels(self)
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _record(self):
+        with self._lock:
+            self.calls += 1
+
+    def delay(self):
+        with self._lock:
+            return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    @staticmethod
+    def answer(prompt) -> str:
+        prompt = str(prompt)
+        start = prompt.rfind("\n{\n")
+        if start != -1:
+            try:
+                return json.dumps(json.loads(prompt[start:]))
+            except ValueError:
+                pass
+        return "The project is tracking close to plan. Review departments with the largest variance first."
+
+    def close(self):
+        pass
+
+
+def install(db=None, gemini=None):
+    """
+    Make get_db() and the Gemini service use these objects in this process
+    """
+    import config.database
+    import services.gemini_ai
+
+    for holder, value in ((config.database.supabase_client, db), (services.gemini_ai.gemini_client, gemini)):
+        if value is not None:
+            with holder._lock:
+                holder._value = value
+                holder._pid = os.getpid()
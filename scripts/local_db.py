@@ -0,0 +1,51 @@
+"""
+Local Database - fill the SQLite backend used with DB_BACKEND=sqlite
+
+    python scripts/local_db.py --sample 10            # 10 generated projects
+    python scripts/local_db.py --from-supabase        # copy the Supabase tables
+    python scripts/local_db.py --path other.sqlite3 --sample 3 --budget-lines 500
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: F401  (loads .env)
+from config.database import SQLITE_PATH
+from config.sqlite_db import SQLiteClient
+
+TABLES = ("projects", "budgets", "schedules", "pos", "invoices", "crew")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=SQLITE_PATH, help=f"SQLite file [{SQLITE_PATH}]")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sample", type=int, metavar="PROJECTS", help="generate this many sample projects")
+    source.add_argument("--from-supabase", action="store_true", help="copy every table from Supabase")
+    parser.add_argument("--budget-lines", type=int, default=40, help="budget lines per sample project")
+    args = parser.parse_args()
+
+    if args.from_supabase:
+        from config.database import create_supabase_client
+        from services.analytics_replica import fetch_table
+
+        supabase = create_supabase_client()
+        tables = {table: fetch_table(supabase, table) for table in TABLES}
+    else:
+        from fakes import generate_dataset
+
+        tables = generate_dataset(projects=args.sample, budget_lines=args.budget_lines)
+
+    db = SQLiteClient(args.path)
+    for table in TABLES:
+        db.replace_table(table, tables[table])
+        print(f"✅ {table}: {len(tables[table])} rows")
+    db.close()
+    print(f"Run the API on it with DB_BACKEND=sqlite SQLITE_PATH={args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Database Setup - indexes, server-side aggregate views, event ordering and the KPI snapshot table
+Run once against the Supabase Postgres database.
+
+    python scripts/setup_db.py           # print the SQL (paste into the Supabase SQL editor)
+    python scripts/setup_db.py --apply   # execute it using DATABASE_URL (requires psycopg2)
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AGGREGATE_SQL = """
+-- Indexes used by every per-project read
+create index if not exists budgets_project_id_idx on budgets (project_id);
+create index if not exists schedules_project_id_idx on schedules (project_id, day);
+create index if not exists pos_project_id_idx on pos (project_id);
+
+-- Budget totals per project
+create or replace view budget_totals as
+select
+    project_id,
+    count(*)                     as line_count,
+    coalesce(sum(planned), 0)    as total_planned,
+    coalesce(sum(committed), 0)  as total_committed,
+    coalesce(sum(actual), 0)     as total_actual
+from budgets
+group by project_id;
+
+-- Planned vs actual per department
+create or replace view budget_dept_variance as
+select
+    project_id,
+    dept,
+    coalesce(sum(planned), 0)                           as planned,
+    coalesce(sum(committed), 0)                         as committed,
+    coalesce(sum(actual), 0)                            as actual,
+    coalesce(sum(planned), 0) - coalesce(sum(actual), 0) as variance
+from budgets
+group by project_id, dept;
+
+-- Schedule days per status
+create or replace view schedule_status_counts as
+select
+    project_id,
+    coalesce(status, 'unknown') as status,
+    count(*)                    as day_count
+from schedules
+group by project_id, coalesce(status, 'unknown');
+
+-- Purchase order count and amount per project
+create or replace view po_totals as
+select
+    project_id,
+    count(*)                  as total_count,
+    coalesce(sum(amount), 0)  as total_amount
+from pos
+group by project_id;
+
+-- Event ids and insert order, used by each worker to tail the events table
+alter table events add column if not exists event_id text;
+alter table events add column if not exists seq bigint generated by default as identity;
+create index if not exists events_seq_idx on events (seq);
+
+-- Daily KPI snapshots per project (dept = '') and per department
+create table if not exists kpi_snapshots (
+    project_id  text    not null,
+    dept        text    not null default '',
+    day         date    not null,
+    burn_rate   numeric,
+    cpi         numeric,
+    spi         numeric,
+    planned     numeric,
+    actual      numeric,
+    variance    numeric,
+    primary key (project_id, dept, day)
+);
+"""
+
+
+def apply_sql(sql: str):
+    """
+    Execute SQL directly against Postgres
+    """
+    try:
+        import psycopg2
+    except ImportError:
+        print("❌ psycopg2 not installed. Install with: pip install psycopg2-binary")
+        return False
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("❌ DATABASE_URL not found in .env file")
+        return False
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute(sql)
+        print("✅ Database setup complete!")
+        return True
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if "--apply" in sys.argv:
+        apply_sql(AGGREGATE_SQL)
+    else:
+        print(AGGREGATE_SQL)
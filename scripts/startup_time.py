@@ -0,0 +1,104 @@
+"""
+Startup Time - measures cold import and startup of the app
+Each run is a fresh interpreter, like a new container worker.
+
+    python scripts/startup_time.py                 # 5 runs, prints a JSON summary
+    python scripts/startup_time.py --runs 20 --out startup.json
+    python scripts/startup_time.py --top 15        # also list the slowest imports
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports main, then runs the app's startup and shutdown once
+PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+async def run():
+    async with main.lifespan(main.app):
+        pass
+asyncio.run(run())
+print(json.dumps({
+    "total_import_ms": (imported - started) * 1000,
+    "import_ms": main.startup_stats["import_ms"],
+    "startup_ms": main.startup_stats["startup_ms"]
+}))
+"""
+
+# Keep background work (network warmup, pollers, snapshots) out of the measurement
+PROBE_ENV = {
+    "HTTP_WARMUP": "0",
+    "KPI_EVENT_POLL_INTERVAL": "0",
+    "KPI_SNAPSHOT_TIME": ""
+}
+
+
+def run_once():
+    env = {**os.environ, **PROBE_ENV}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(count: int):
+    """
+    Cumulative import time per top-level module, from python -X importtime
+    """
+    env = {**os.environ, **PROBE_ENV}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules.append((int(cumulative) / 1000, name.rstrip()))
+    modules.sort(reverse=True)
+    return [{"module": name.strip(), "depth": (len(name) - len(name.lstrip())) // 2, "ms": round(ms, 1)}
+            for ms, name in modules[:count]]
+
+
+def summarize(values):
+    return {
+        "min": round(min(values), 1),
+        "median": round(statistics.median(values), 1),
+        "max": round(max(values), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest imports")
+    parser.add_argument("--out", help="also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    summary = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": summarize([r["total_import_ms"] for r in runs]),
+        "startup_ms": summarize([r["startup_ms"] for r in runs])
+    }
+    if args.top:
+        summary["slowest_imports"] = slowest_imports(args.top)
+
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
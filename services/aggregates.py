@@ -0,0 +1,193 @@
+# ============================================
+# FILE: services/aggregates.py
+# ============================================
+
+import os
+import time
+from config.database import gather_queries, run_query
+
+# Set AGGREGATE_PUSHDOWN=0 to always aggregate in Python
+AGGREGATE_PUSHDOWN = os.getenv("AGGREGATE_PUSHDOWN", "1") != "0"
+# Projects with at most this many rows are summed in Python from one narrow select (0 = always use the views)
+AGGREGATE_PYTHON_MAX_ROWS = int(os.getenv("AGGREGATE_PYTHON_MAX_ROWS", "200"))
+# Seconds before the views are tried again after they were reported missing
+AGGREGATE_VIEW_RETRY = float(os.getenv("AGGREGATE_VIEW_RETRY", "300"))
+
+# Set while the views are missing (setup_db.py not run yet); monotonic time of the next retry
+_views_missing_until = 0.0
+
+
+# ----- Python fallbacks (used when rows are already loaded) -----
+
+def sum_budget(rows):
+    """
+    Total planned / committed / actual over budget rows
+    """
+    return {
+        "planned": sum(float(b['planned']) for b in rows),
+        "committed": sum(float(b['committed']) for b in rows),
+        "actual": sum(float(b['actual']) for b in rows)
+    }
+
+
+def budget_by_dept(rows):
+    """
+    Planned / committed / actual / variance per department
+    """
+    depts = {}
+    for b in rows:
+        dept = depts.setdefault(b['dept'], {"dept": b['dept'], "planned": 0.0, "committed": 0.0, "actual": 0.0})
+        dept['planned'] += float(b['planned'])
+        dept['committed'] += float(b['committed'])
+        dept['actual'] += float(b['actual'])
+    for dept in depts.values():
+        dept['variance'] = dept['planned'] - dept['actual']
+    return list(depts.values())
+
+
+def count_by_status(rows):
+    """
+    Number of schedule days per status
+    """
+    status_count = {}
+    for s in rows:
+        status = s.get('status') or 'unknown'
+        status_count[status] = status_count.get(status, 0) + 1
+    return status_count
+
+
+def sum_pos(rows):
+    """
+    PO count and total amount
+    """
+    return {
+        "total_count": len(rows),
+        "total_amount": sum(float(p['amount']) for p in rows)
+    }
+
+
+# ----- Server-side aggregates (views created by scripts/setup_db.py) -----
+
+def _use_views():
+    return AGGREGATE_PUSHDOWN and time.monotonic() >= _views_missing_until
+
+
+def _is_missing_relation(e):
+    # Postgres undefined_table, PostgREST schema cache miss, SQLite backend
+    text = str(e)
+    return any(marker in text for marker in ("42P01", "PGRST205", "no such table"))
+
+
+def _view_failed(e):
+    """
+    Skip the views for AGGREGATE_VIEW_RETRY seconds if they are missing;
+    any other error (a timeout, say) only falls back for the current call
+    """
+    global _views_missing_until
+    if _is_missing_relation(e):
+        print(f"Aggregate views missing, using Python fallback for {AGGREGATE_VIEW_RETRY:.0f}s: {e}")
+        _views_missing_until = time.monotonic() + AGGREGATE_VIEW_RETRY
+    else:
+        print(f"Aggregate view query failed, using Python fallback: {e}")
+
+
+async def _small_rows(query):
+    """
+    The rows of a narrow select if there are at most AGGREGATE_PYTHON_MAX_ROWS,
+    else None (the caller then asks the views)
+    """
+    if not AGGREGATE_PYTHON_MAX_ROWS:
+        return None
+    result = await run_query(query.limit(AGGREGATE_PYTHON_MAX_ROWS + 1))
+    return result.data if len(result.data) <= AGGREGATE_PYTHON_MAX_ROWS else None
+
+
+async def get_budget_aggregates(db, project_id: str):
+    """
+    Budget totals and per-department variance for a project
+    """
+    budget_query = lambda: db.table('budgets').select("dept, planned, committed, actual").eq('project_id', project_id)
+    rows = await _small_rows(budget_query()) if _use_views() else None
+    if rows is not None:
+        return _budget_from_rows(rows)
+    if _use_views():
+        try:
+            totals, depts = await gather_queries(
+                db.table('budget_totals').select("*").eq('project_id', project_id),
+                db.table('budget_dept_variance').select("*").eq('project_id', project_id)
+            )
+            row = totals.data[0] if totals.data else {}
+            return {
+                "line_count": int(row.get('line_count') or 0),
+                "totals": {
+                    "planned": float(row.get('total_planned') or 0),
+                    "committed": float(row.get('total_committed') or 0),
+                    "actual": float(row.get('total_actual') or 0)
+                },
+                "by_department": [
+                    {
+                        "dept": d['dept'],
+                        "planned": float(d['planned']),
+                        "committed": float(d['committed']),
+                        "actual": float(d['actual']),
+                        "variance": float(d['variance'])
+                    }
+                    for d in depts.data
+                ]
+            }
+        except Exception as e:
+            _view_failed(e)
+
+    result = await run_query(budget_query())
+    return _budget_from_rows(result.data)
+
+
+def _budget_from_rows(rows):
+    return {
+        "line_count": len(rows),
+        "totals": sum_budget(rows),
+        "by_department": budget_by_dept(rows)
+    }
+
+
+async def get_schedule_aggregates(db, project_id: str):
+    """
+    Schedule day count and status breakdown for a project
+    """
+    schedule_query = lambda: db.table('schedules').select("status").eq('project_id', project_id)
+    rows = await _small_rows(schedule_query()) if _use_views() else None
+    if rows is not None:
+        return {"total_days": len(rows), "status_breakdown": count_by_status(rows)}
+    if _use_views():
+        try:
+            result = await run_query(db.table('schedule_status_counts').select("*").eq('project_id', project_id))
+            status_count = {s['status']: int(s['day_count']) for s in result.data}
+            return {"total_days": sum(status_count.values()), "status_breakdown": status_count}
+        except Exception as e:
+            _view_failed(e)
+
+    result = await run_query(schedule_query())
+    return {"total_days": len(result.data), "status_breakdown": count_by_status(result.data)}
+
+
+async def get_po_aggregates(db, project_id: str):
+    """
+    PO count and total amount for a project
+    """
+    po_query = lambda: db.table('pos').select("amount").eq('project_id', project_id)
+    rows = await _small_rows(po_query()) if _use_views() else None
+    if rows is not None:
+        return sum_pos(rows)
+    if _use_views():
+        try:
+            result = await run_query(db.table('po_totals').select("*").eq('project_id', project_id))
+            row = result.data[0] if result.data else {}
+            return {
+                "total_count": int(row.get('total_count') or 0),
+                "total_amount": float(row.get('total_amount') or 0)
+            }
+        except Exception as e:
+            _view_failed(e)
+
+    result = await run_query(po_query())
+    return sum_pos(result.data)
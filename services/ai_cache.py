@@ -0,0 +1,133 @@
+# ============================================
+# FILE: services/ai_cache.py
+# ============================================
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Disk-backed store for Gemini results so repeated analyses survive restarts
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", ".cache/ai_results.sqlite3")
+AI_CACHE_TTL_SECONDS = float(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "2000"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def make_key(model: str, template: str, prompt: str):
+    """
+    Content address for one Gemini call
+    The prompt already embeds the template text and the input rows,
+    so any change to either produces a new key
+    """
+    digest = hashlib.sha256()
+    for part in (model, template, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AIResultCache:
+    """
+    SQLite-backed key/value cache with TTL and size-based eviction
+    Least recently used entries are evicted first
+    """
+
+    def __init__(self, path: str = AI_CACHE_PATH, ttl: float = AI_CACHE_TTL_SECONDS,
+                 max_entries: int = AI_CACHE_MAX_ENTRIES, max_bytes: int = AI_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "create table if not exists ai_results ("
+                " key text primary key,"
+                " value text not null,"
+                " size integer not null,"
+                " expires_at real not null,"
+                " last_used real not null)"
+            )
+            self._conn.execute("create index if not exists ai_results_last_used on ai_results (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str):
+        """
+        Returns the cached value, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("select value, expires_at from ai_results where key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    conn.execute("delete from ai_results where key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return None
+            conn.execute("update ai_results set last_used = ? where key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value):
+        encoded = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "insert or replace into ai_results (key, value, size, expires_at, last_used) values (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now + self.ttl, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then least recently used rows until under both limits"""
+        conn.execute("delete from ai_results where expires_at < ?", (now,))
+        count, total = conn.execute("select count(*), coalesce(sum(size), 0) from ai_results").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, size in conn.execute("select key, size from ai_results order by last_used").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            conn.execute("delete from ai_results where key = ?", (key,))
+            count -= 1
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("delete from ai_results")
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            count, total = self._connect().execute(
+                "select count(*), coalesce(sum(size), 0) from ai_results"
+            ).fetchone()
+            return {
+                "entries": count,
+                "bytes": total,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# Shared instance for the Gemini service
+ai_cache = AIResultCache()
@@ -2,55 +2,52 @@
 # FILE: services/ai_features.py
 # ============================================
 
-from config.database import get_db
+# Columns each feature builder reads, so callers can select only these
+BUDGET_FEATURE_FIELDS = "dept,planned,committed,actual"
+SCHEDULE_FEATURE_FIELDS = "day,status,scene,location"
+PO_FEATURE_FIELDS = "vendor,amount,status"
 
-def get_budget_features(project_id: str):
+def budget_features(rows):
     """
-    Prepare budget data for AI model
-    Returns clean tabular data
+    Project raw budget rows onto the fields the AI model uses
     """
-    try:
-        db = get_db()
-        result = db.table('budgets').select("*").eq('project_id', project_id).execute()
-        
-        # Format for AI consumption
-        features = []
-        for budget in result.data:
-            features.append({
-                "dept": budget['dept'],
-                "planned": float(budget['planned']),
-                "committed": float(budget['committed']),
-                "actual": float(budget['actual']),
-                "variance": float(budget['planned']) - float(budget['actual'])
-            })
-        
-        return features
-        
-    except Exception as e:
-        print(f"Error getting budget features: {e}")
-        return []
+    features = []
+    for budget in rows:
+        features.append({
+            "dept": budget['dept'],
+            "planned": float(budget['planned']),
+            "committed": float(budget['committed']),
+            "actual": float(budget['actual']),
+            "variance": float(budget['planned']) - float(budget['actual'])
+        })
+    return features
 
 
-def get_schedule_features(project_id: str):
+def schedule_features(rows):
     """
-    Prepare schedule data for AI model
+    Project raw schedule rows onto the fields the AI model uses
     """
-    try:
-        db = get_db()
-        result = db.table('schedules').select("*").eq('project_id', project_id).execute()
-        
-        features = []
-        for schedule in result.data:
-            features.append({
-                "day": schedule['day'],
-                "status": schedule['status'],
-                "scene": schedule.get('scene', ''),
-                "location": schedule.get('location', '')
-            })
-        
-        return features
-        
-    except Exception as e:
-        print(f"Error getting schedule features: {e}")
-        return []
+    features = []
+    for schedule in rows:
+        features.append({
+            "day": schedule['day'],
+            "status": schedule['status'],
+            "scene": schedule.get('scene', ''),
+            "location": schedule.get('location', '')
+        })
+    return features
+
+
+def po_features(rows):
+    """
+    Project raw purchase order rows onto the fields the AI model uses
+    """
+    features = []
+    for po in rows:
+        features.append({
+            "vendor": po.get('vendor', ''),
+            "amount": float(po['amount']),
+            "status": po.get('status', '')
+        })
+    return features
 
@@ -0,0 +1,143 @@
+# ============================================
+# FILE: services/analytics_replica.py
+# ============================================
+
+import os
+import time
+import threading
+from datetime import datetime
+from config.database import DB_BACKEND, get_db
+from config.http_clients import PerWorker
+
+# Local SQLite copy of the project tables for KPI and report queries ("" = off)
+ANALYTICS_REPLICA_PATH = os.getenv("ANALYTICS_REPLICA_PATH", "")
+# Seconds between refreshes, which bounds how stale replica reads can be; rows per page copied
+ANALYTICS_SYNC_INTERVAL = float(os.getenv("ANALYTICS_SYNC_INTERVAL", "300"))
+ANALYTICS_SYNC_BATCH_SIZE = int(os.getenv("ANALYTICS_SYNC_BATCH_SIZE", "1000"))
+
+REPLICA_TABLES = ("projects", "budgets", "schedules", "pos", "invoices")
+
+
+def _create_replica():
+    from config.sqlite_db import SQLiteClient
+    return SQLiteClient(ANALYTICS_REPLICA_PATH)
+
+
+replica_client = PerWorker(_create_replica, close=lambda client: client.close())
+
+
+def fetch_table(db, table: str, batch_size: int = ANALYTICS_SYNC_BATCH_SIZE):
+    """
+    Every row of a table, read in id order one page at a time
+    """
+    rows, last_id = [], None
+    while True:
+        query = db.table(table).select("*").order('id').limit(batch_size)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        page = query.execute().data
+        rows += page
+        if len(page) < batch_size:
+            return rows
+        last_id = page[-1]['id']
+
+
+class ReplicaSync:
+    """
+    Background thread that copies the project tables into the analytics replica
+
+    Each table is swapped in one transaction, so replica readers see either
+    the previous copy or the new one. Several workers can share one replica
+    file: a worker skips its refresh when another one refreshed it recently.
+    """
+
+    def __init__(self, path: str = ANALYTICS_REPLICA_PATH, interval: float = ANALYTICS_SYNC_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.ready = False
+        self.last_sync = None
+        self.last_result = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        # With the SQLite backend the primary database is already local
+        return bool(self.path) and DB_BACKEND != "sqlite"
+
+    def start(self):
+        if self.enabled and self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="analytics-replica", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error syncing analytics replica: {e}")
+            self._stopping.wait(self.interval)
+
+    def _shared_sync_time(self, replica):
+        """When any worker last completed a sync of this replica file"""
+        replica.run(lambda conn: conn.execute(
+            "create table if not exists replica_state (id integer primary key check (id = 1), synced_at real)"
+        ))
+        row = replica.run(lambda conn: conn.execute("select synced_at from replica_state").fetchone())
+        return row['synced_at'] if row else 0.0
+
+    def sync(self, force: bool = False):
+        """
+        Copy REPLICA_TABLES from the primary database into the replica
+        """
+        replica = replica_client.get()
+        if not force and time.time() - self._shared_sync_time(replica) < self.interval / 2:
+            self.ready = True
+            return {"skipped": True}
+
+        started = time.perf_counter()
+        db = get_db()
+        counts = {}
+        for table in REPLICA_TABLES:
+            rows = fetch_table(db, table)
+            replica.replace_table(table, rows)
+            counts[table] = len(rows)
+        replica.run(lambda conn: conn.execute(
+            "insert or replace into replica_state (id, synced_at) values (1, ?)", (time.time(),)
+        ))
+
+        self.ready = True
+        self.last_sync = datetime.utcnow().isoformat()
+        self.last_result = {"rows": counts, "seconds": round(time.perf_counter() - started, 2)}
+        return self.last_result
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "interval": self.interval,
+            "last_sync": self.last_sync,
+            "last_result": self.last_result
+        }
+
+
+# Shared replica sync, started with the app
+replica_sync = ReplicaSync()
+
+
+def get_analytics_db():
+    """
+    Database for KPI and report reads: the analytics replica once it holds a
+    copy, otherwise the primary database
+    Reads may lag writes by up to ANALYTICS_SYNC_INTERVAL seconds
+    """
+    if replica_sync.enabled and replica_sync.ready:
+        return replica_client.get()
+    return get_db()
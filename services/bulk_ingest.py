@@ -0,0 +1,154 @@
+# ============================================
+# FILE: services/bulk_ingest.py
+# ============================================
+
+import io
+import os
+import csv
+import json
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from config.database import run_query
+from services.event_bus import log_event
+
+# Rows per insert request for bulk imports
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
+
+def detect_format(upload):
+    """
+    'csv' or 'ndjson', from the upload's content type or file extension
+    """
+    content_type = (upload.content_type or "").lower()
+    filename = (upload.filename or "").lower()
+    if "csv" in content_type or filename.endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+
+def iter_records(upload, fmt: str):
+    """
+    Yield (row_number, record, error) for each line of the upload
+    Parsing errors are reported per row instead of stopping the import
+    """
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for number, row in enumerate(reader, start=1):
+            # Empty cells fall back to the model defaults
+            yield number, {k: v for k, v in row.items() if k and v not in ("", None)}, None
+        return
+
+    for number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("each line must be a JSON object")
+            yield number, record, None
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+
+
+def _read_batch(records, model, prepare, size: int):
+    """
+    Pull up to `size` parsed rows and validate them against the Pydantic model
+    Returns (valid [(row_number, row_dict)], errors, exhausted)
+    """
+    valid, errors = [], []
+    for number, record, error in records:
+        if error is None:
+            try:
+                row = model(**record).dict()
+                valid.append((number, prepare(row) if prepare else row))
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+        if error is not None:
+            errors.append({"row": number, "error": error})
+        if len(valid) + len(errors) >= size:
+            return valid, errors, False
+    return valid, errors, True
+
+
+def _rejected(e):
+    """
+    Whether the database refused the insert, so nothing was written, as
+    opposed to a request that failed in transit and may have been written
+    """
+    # SQLite backend; Postgres data (22), integrity (23) and 4x errors and PostgREST request errors
+    import sqlite3
+    if isinstance(e, sqlite3.Error):
+        return True
+    code = str(getattr(e, "code", None) or "")
+    return type(e).__name__ == "APIError" and code.startswith(("22", "23", "4", "PGRST"))
+
+
+async def _insert_batch(db, table: str, batch):
+    """
+    Insert a batch in one request; if the database rejects it, retry the rows
+    one by one so only the offending rows are reported
+    Any other failure (a timeout, say) fails the whole batch without retrying,
+    since the batch may have been written before the response was lost
+    """
+    try:
+        result = await run_query(db.table(table).insert([row for _, row in batch]))
+        return result.data, []
+    except Exception as e:
+        if not _rejected(e):
+            print(f"Bulk insert into {table} failed, not retrying {len(batch)} rows: {e}")
+            error = f"Batch insert failed, the row may or may not have been saved: {e}"
+            return [], [{"row": number, "error": error} for number, _ in batch]
+        inserted, errors = [], []
+        for number, row in batch:
+            try:
+                result = await run_query(db.table(table).insert(row))
+                inserted.extend(result.data)
+            except Exception as e:
+                errors.append({"row": number, "error": str(e)})
+        return inserted, errors
+
+
+async def ingest(db, upload, model, table: str, event_type: str, project_ids, summarize, prepare=None,
+                 batch_size: int = BULK_BATCH_SIZE):
+    """
+    Stream an NDJSON/CSV upload into `table` in batches
+
+    project_ids(inserted_rows) -> awaitable {project_id: [rows]} used to log
+    one aggregated `event_type` event per project per batch, with a payload
+    built by summarize(rows)
+    """
+    records = iter_records(upload, detect_format(upload))
+    inserted_count, errors, batches = 0, [], 0
+
+    while True:
+        valid, batch_errors, exhausted = await run_in_threadpool(_read_batch, records, model, prepare, batch_size)
+        errors.extend(batch_errors)
+
+        if valid:
+            inserted, insert_errors = await _insert_batch(db, table, valid)
+            errors.extend(insert_errors)
+            inserted_count += len(inserted)
+            batches += 1
+
+            for project_id, rows in (await project_ids(inserted)).items():
+                log_event(project_id, event_type, {"batch": batches, **summarize(rows)})
+
+        if exhausted:
+            break
+
+    return {
+        "inserted": inserted_count,
+        "failed": len(errors),
+        "batches": batches,
+        "errors": sorted(errors, key=lambda e: e['row'])
+    }
+
+
+async def group_by_project(rows):
+    """project_ids() for tables that carry project_id directly"""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row['project_id'], []).append(row)
+    return grouped
@@ -0,0 +1,122 @@
+# ============================================
+# FILE: services/cache.py
+# ============================================
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Seconds a cached read stays fresh, and the most entries kept in memory
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+
+class ProjectCache:
+    """
+    In-process TTL + LRU cache keyed by (project_id, table)
+    Writes for a project drop every entry cached for that project
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (project_id, table) -> (expires_at, value)
+        # project_id -> value of _counter at its last invalidation, least recent first;
+        # kept to max_entries projects, older ones share _floor (the newest value dropped)
+        self._generations = OrderedDict()
+        self._counter = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, project_id: str, table: str):
+        """
+        Returns (True, value) on a fresh hit, (False, None) otherwise
+        """
+        key = (str(project_id), table)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def generation(self, project_id: str):
+        with self._lock:
+            return self._generations.get(str(project_id), self._floor)
+
+    def set(self, project_id: str, table: str, value, generation: int = None):
+        """
+        Store a value; skipped if the project was invalidated since `generation`
+        so a slow read can't put stale rows back after a write
+        """
+        key = (str(project_id), table)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[0], self._floor):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, project_id: str, table: str = None):
+        """
+        Drop one table, or every table, cached for a project
+        """
+        project_id = str(project_id)
+        with self._lock:
+            self._counter += 1
+            self._generations[project_id] = self._counter
+            self._generations.move_to_end(project_id)
+            while len(self._generations) > self.max_entries:
+                # Any read that started before this invalidation now sees a newer generation
+                _, self._floor = self._generations.popitem(last=False)
+            if table is not None:
+                self._entries.pop((project_id, table), None)
+                return
+            for key in [k for k in self._entries if k[0] == project_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidated_projects": len(self._generations),
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0
+            }
+
+
+# Shared instance for all routes
+project_cache = ProjectCache()
+
+
+async def cached(project_id: str, table: str, loader):
+    """
+    Read-through helper: return the cached value or await loader() and store it
+    loader is a zero-argument callable returning an awaitable
+    """
+    hit, value = project_cache.get(project_id, table)
+    if hit:
+        return value
+    generation = project_cache.generation(project_id)
+    value = await loader()
+    project_cache.set(project_id, table, value, generation)
+    return value
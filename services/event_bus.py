@@ -2,27 +2,238 @@
 # FILE: services/event_bus.py
 # ============================================
 
+import os
+import glob
+import json
+import time
+import uuid
+import queue
+import threading
 from config.database import get_db
 from datetime import datetime
+from services.cache import project_cache
+from utils.processes import process_tag, process_alive
+
+# Buffered writer settings: rows per insert, max seconds between flushes and
+# queue capacity; events that don't fit spill to disk, each process to its
+# own file next to EVENT_SPILL_PATH
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "100"))
+EVENT_FLUSH_INTERVAL = float(os.getenv("EVENT_FLUSH_INTERVAL", "1.0"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+EVENT_SPILL_PATH = os.getenv("EVENT_SPILL_PATH", ".cache/events_spill.ndjson")
+
+
+class EventWriter:
+    """
+    Buffers events in memory and writes them to the events table in batches
+    from a background thread
+
+    - flushes when a batch fills or the flush interval passes
+    - put() never waits for the writer: when the queue is full the event is
+      appended to the spill file straight away, so memory stays bounded
+    - events that can't be queued or inserted are appended to this process's
+      NDJSON spill file and replayed after the next successful insert;
+      spill files left by exited processes are replayed too
+    - stop() drains and flushes everything that is still buffered
+    """
+
+    def __init__(self, batch_size: int = EVENT_BATCH_SIZE, interval: float = EVENT_FLUSH_INTERVAL,
+                 max_queue: int = EVENT_QUEUE_SIZE, spill_path: str = EVENT_SPILL_PATH):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.spill_path = spill_path
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.spilled = 0
+        self.replayed = 0
+        self._thread = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+
+    def put(self, event: dict):
+        """
+        Queue one event, or spill it if the queue is full; safe to call from the event loop
+        """
+        self.start()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self._spill([event])
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Stop the background thread after flushing everything queued
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # Anything left (thread timed out or never started)
+        remaining = self._drain(wait=False)
+        if remaining:
+            self._flush(remaining)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._drain(wait=True)
+            if batch:
+                self._flush(batch)
+        while True:
+            batch = self._drain(wait=False)
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _drain(self, wait: bool):
+        """Collect up to batch_size events, waiting at most one flush interval"""
+        batch = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            try:
+                if wait:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, events):
+        get_db().table('events').insert(events).execute()
+
+    def _flush(self, batch):
+        try:
+            self._insert(batch)
+            self.written += len(batch)
+        except Exception as e:
+            print(f"Error writing {len(batch)} events, spilling to disk: {e}")
+            self._spill(batch)
+            return
+        self._replay_spill()
+
+    @property
+    def spill_file(self):
+        """This process's spill file: EVENT_SPILL_PATH with the process tag before the extension"""
+        base, ext = os.path.splitext(self.spill_path)
+        return f"{base}.{process_tag()}{ext}"
+
+    def _spill(self, events):
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_file, "a", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps(event, default=str) + "\n")
+            self.spilled += len(events)
+
+    def _spill_files(self):
+        """This process's spill file plus those left by processes that have exited"""
+        base, ext = os.path.splitext(self.spill_path)
+        own = self.spill_file
+        # The unsuffixed path is where older releases spilled from every process
+        files = [path for path in (own, self.spill_path) if os.path.exists(path)]
+        for path in glob.glob(f"{glob.escape(base)}.*{ext}"):
+            tag = path[len(base) + 1:len(path) - len(ext)]
+            if path != own and not process_alive(tag):
+                files.append(path)
+        # Files a process claimed for replay but didn't finish before exiting
+        for path in glob.glob(f"{glob.escape(base)}.*{ext}.replay-*"):
+            if not process_alive(path.rsplit(".replay-", 1)[1]):
+                files.append(path)
+        return files
+
+    def _claim(self, path):
+        """
+        Move a spill file aside so no more events are appended to it; None if
+        another process claimed it first
+        """
+        claimed = f"{path.split('.replay-')[0]}.replay-{process_tag()}"
+        try:
+            os.replace(path, claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    def _replay_spill(self):
+        """Re-insert spilled events now that the database is reachable again"""
+        for path in self._spill_files():
+            with self._spill_lock:
+                claimed = self._claim(path)
+            if claimed is None:
+                continue
+            with open(claimed, encoding="utf-8") as f:
+                events = [json.loads(line) for line in f if line.strip()]
+            # Removed only once every event is inserted or spilled again
+            for i in range(0, len(events), self.batch_size):
+                batch = events[i:i + self.batch_size]
+                try:
+                    self._insert(batch)
+                    self.replayed += len(batch)
+                except Exception as e:
+                    print(f"Error replaying spilled events: {e}")
+                    self._spill(events[i:])
+                    os.remove(claimed)
+                    return
+            os.remove(claimed)
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "spill_pending": os.path.exists(self.spill_file)
+        }
+
+
+# Shared writer for the whole process
+event_writer = EventWriter()
+
+# In-process subscribers called with every logged event
+_subscribers = []
+
+
+def subscribe(handler):
+    """
+    Register handler(event_data) to run for every event logged in this process
+    """
+    _subscribers.append(handler)
+
 
 def log_event(project_id: str, event_type: str, payload: dict):
     """
     Log an event to the events table
     This creates an audit trail and triggers for AI processing
+    Any cached reads for the project are invalidated
+
+    The insert happens asynchronously in batches; the queued event is returned
+    event_id identifies the event across workers (see services/kpi_store.py)
     """
-    try:
-        db = get_db()
-        
-        event_data = {
-            "project_id": project_id,
-            "type": event_type,
-            "payload_json": payload,
-            "created_at": datetime.utcnow().isoformat()
-        }
-        
-        result = db.table('events').insert(event_data).execute()
-        return result.data[0] if result.data else None
-        
-    except Exception as e:
-        print(f"Error logging event: {e}")
-        return None
+    project_cache.invalidate(project_id)
+    
+    event_data = {
+        "event_id": uuid.uuid4().hex,
+        "project_id": project_id,
+        "type": event_type,
+        "payload_json": payload,
+        "created_at": datetime.utcnow().isoformat()
+    }
+    
+    for handler in _subscribers:
+        try:
+            handler(event_data)
+        except Exception as e:
+            print(f"Error in event subscriber: {e}")
+    
+    event_writer.put(event_data)
+    return event_data
@@ -5,37 +5,140 @@ Connects your backend to Google Gemini AI for predictions and insights
 
 import os
 import json
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Import Gemini
-try:
-    from google import genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    print("⚠️  Warning: google-genai not installed. Install with: pip install google-genai")
-    GEMINI_AVAILABLE = False
+import time
+import threading
+from services.ai_cache import ai_cache, make_key
+from services.singleflight import SingleFlight
+from services.ai_features import budget_features, schedule_features, po_features
+from services.prompt_encoding import EncodedPrompt, encode_tables, to_compact_json
+from config.http_clients import GEMINI_TIMEOUT, PerWorker, client_args, warmup
+from utils.metrics import record_gemini_call
 
 # Configure Gemini AI
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if GEMINI_AVAILABLE and GEMINI_API_KEY:
-    client = genai.Client(api_key=GEMINI_API_KEY)
-else:
-    client = None
+# Columns sent to Gemini for each table (see services/ai_features.py)
+BUDGET_COLUMNS = ["dept", "planned", "committed", "actual", "variance"]
+SCHEDULE_COLUMNS = ["day", "status", "scene", "location"]
+PO_COLUMNS = ["vendor", "amount", "status"]
+
+# Upper bound on concurrent Gemini requests per worker, and how long a call
+# may wait for a free slot before giving up instead of tying up a thread
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "30"))
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/"
+
+def create_gemini_client():
+    """
+    New Gemini client on a pooled, tuned HTTP transport
+    google.genai is imported here, on first use, because it is slow to import
+    """
     if not GEMINI_API_KEY:
         print("⚠️  Warning: GEMINI_API_KEY not found in .env file")
+        return None
+    try:
+        from google import genai
+    except ImportError:
+        print("⚠️  Warning: google-genai not installed. Install with: pip install google-genai")
+        return None
+    
+    args = client_args(read_timeout=GEMINI_TIMEOUT)
+    # The SDK sets the per-call timeout itself (in milliseconds)
+    del args['timeout']
+    return genai.Client(
+        api_key=GEMINI_API_KEY,
+        http_options=genai.types.HttpOptions(timeout=int(GEMINI_TIMEOUT * 1000), client_args=args)
+    )
+
+# One Gemini client (and connection pool) per worker process, built on first use
+gemini_client = PerWorker(create_gemini_client, close=lambda client: client.close())
 
 class GeminiAIService:
     """Service to use Gemini AI for film production predictions"""
     
     def __init__(self):
-        self.client = client
         self.model = "gemini-2.0-flash-exp"
+        self.limiter = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+        self.flight = SingleFlight()
+    
+    @property
+    def client(self):
+        return gemini_client.get()
+    
+    def warmup(self):
+        """
+        Open a pooled connection to the Gemini API before the first request
+        """
+        if not self.client:
+            return None
+        # The SDK doesn't expose its httpx client; skip the warmup if its internals change
+        http_client = getattr(getattr(self.client, "_api_client", None), "_httpx_client", None)
+        if http_client is None:
+            return None
+        return warmup(http_client, GEMINI_BASE_URL)
+    
+    def _generate(self, prompt):
+        """
+        Single Gemini completion, returns the response text
+        Waits for a slot in the global concurrency limit first
+        """
+        queued = time.perf_counter()
+        if not self.limiter.acquire(timeout=GEMINI_QUEUE_TIMEOUT):
+            record_gemini_call("generate", queued, 0.0, len(prompt), "busy", time.perf_counter() - queued)
+            raise RuntimeError("Gemini AI is busy, try again shortly")
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=prompt
+            )
+            outcome = "ok"
+            return response.text
+        finally:
+            self.limiter.release()
+            record_gemini_call("generate", started, time.perf_counter() - started, len(prompt), outcome,
+                               started - queued)
+    
+    @staticmethod
+    def _parse_json(response_text):
+        """
+        Parse a JSON answer, stripping markdown fences if present
+        """
+        response_text = response_text.strip()
+        if response_text.startswith('```json'):
+            response_text = response_text[7:]
+        if response_text.startswith('```'):
+            response_text = response_text[3:]
+        if response_text.endswith('```'):
+            response_text = response_text[:-3]
+        return json.loads(response_text.strip())
+    
+    def _cached_call(self, template, prompt, parse_json=True, refresh=False):
+        """
+        Gemini call backed by the content-addressed result cache
+        refresh=True skips the lookup and overwrites the stored result
+        Concurrent callers with the same key are coalesced
+        """
+        key = make_key(self.model, template, prompt)
+        if not refresh:
+            cached = ai_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        def call_gemini():
+            response_text = self._generate(prompt)
+            result = self._parse_json(response_text) if parse_json else response_text
+            
+            # Only successful answers reach this point, errors are never cached
+            ai_cache.set(key, result)
+            return result
+        
+        # Identical analyses already in flight share that one upstream call
+        return self.flight.do(key, call_gemini)
     
-    def analyze_budget_risk(self, budget_data):
+    def analyze_budget_risk(self, budget_data, refresh=False):
         """
         Analyze budget risk using Gemini AI
         """
@@ -51,12 +154,12 @@ class GeminiAIService:
             }
         
         try:
-            prompt = f"""
+            budget_csv, = encode_tables([(budget_features(budget_data), BUDGET_COLUMNS)])
+            prompt = EncodedPrompt(f"""
 You are a film production financial analyst. Analyze this budget data and provide risk assessment.
 
-Budget Data:
-{json.dumps(budget_data, indent=2)}
-
+Budget Data (CSV):
+{budget_csv}
 Analyze and provide:
 1. Overall risk level (low/medium/high)
 2. Risk percentage (0-100)
@@ -73,27 +176,11 @@ Respond ONLY with valid JSON in this exact format (no markdown, no extra text):
     "recommendations": [],
     "summary": ""
 }}
-"""
-            
-            # Call Gemini API
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
-            
-            # Parse response
-            response_text = response.text.strip()
+""")
             
-            # Clean markdown if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            result = json.loads(response_text.strip())
-            return result
+            # Call Gemini API (or reuse the cached result for identical input)
+            result = self._cached_call("budget_risk", prompt.text, parse_json=True, refresh=refresh)
+            return {**result, "prompt_tokens": prompt.tokens}
             
         except Exception as e:
             print(f"Error with Gemini AI: {e}")
@@ -107,7 +194,7 @@ Respond ONLY with valid JSON in this exact format (no markdown, no extra text):
                 "summary": "AI service error"
             }
     
-    def analyze_schedule_risk(self, schedule_data):
+    def analyze_schedule_risk(self, schedule_data, refresh=False):
         """
         Analyze schedule delays using Gemini AI
         """
@@ -123,12 +210,12 @@ Respond ONLY with valid JSON in this exact format (no markdown, no extra text):
             }
         
         try:
-            prompt = f"""
+            schedule_csv, = encode_tables([(schedule_features(schedule_data), SCHEDULE_COLUMNS)])
+            prompt = EncodedPrompt(f"""
 You are a film production scheduling expert. Analyze this shooting schedule and predict delays.
 
-Schedule Data:
-{json.dumps(schedule_data, indent=2)}
-
+Schedule Data (CSV):
+{schedule_csv}
 Analyze and provide:
 1. Delay risk level (low/medium/high)
 2. Estimated delay in days
@@ -145,25 +232,10 @@ Respond ONLY with valid JSON (no markdown):
     "recommendations": [],
     "summary": ""
 }}
-"""
-            
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
-            
-            response_text = response.text.strip()
+""")
             
-            # Clean markdown
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            result = json.loads(response_text.strip())
-            return result
+            result = self._cached_call("schedule_risk", prompt.text, parse_json=True, refresh=refresh)
+            return {**result, "prompt_tokens": prompt.tokens}
             
         except Exception as e:
             print(f"Error with Gemini AI: {e}")
@@ -177,7 +249,7 @@ Respond ONLY with valid JSON (no markdown):
                 "summary": "AI service error"
             }
     
-    def analyze_project_overall(self, budget_data, schedule_data, project_info=None):
+    def analyze_project_overall(self, budget_data, schedule_data, project_info=None, refresh=False):
         """
         Comprehensive project analysis using Gemini AI
         """
@@ -200,7 +272,11 @@ Respond ONLY with valid JSON (no markdown):
             total_days = len(schedule_data)
             completed_days = sum(1 for s in schedule_data if s.get('status') == 'completed')
             
-            prompt = f"""
+            budget_csv, schedule_csv = encode_tables([
+                (budget_features(budget_data), BUDGET_COLUMNS),
+                (schedule_features(schedule_data), SCHEDULE_COLUMNS)
+            ])
+            prompt = EncodedPrompt(f"""
 You are an expert film production consultant. Analyze this project comprehensively.
 
 PROJECT STATS:
@@ -209,12 +285,10 @@ PROJECT STATS:
 - Total Days: {total_days}
 - Days Completed: {completed_days}
 
-BUDGET BREAKDOWN:
-{json.dumps(budget_data, indent=2)}
-
-SCHEDULE STATUS:
-{json.dumps(schedule_data, indent=2)}
-
+BUDGET BREAKDOWN (CSV):
+{budget_csv}
+SCHEDULE STATUS (CSV):
+{schedule_csv}
 Provide comprehensive analysis. Respond ONLY with valid JSON (no markdown):
 {{
     "project_health": "good",
@@ -233,25 +307,10 @@ Provide comprehensive analysis. Respond ONLY with valid JSON (no markdown):
     "key_risks": [],
     "executive_summary": ""
 }}
-"""
-            
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
+""")
             
-            response_text = response.text.strip()
-            
-            # Clean markdown
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            result = json.loads(response_text.strip())
-            return result
+            result = self._cached_call("project_overall", prompt.text, parse_json=True, refresh=refresh)
+            return {**result, "prompt_tokens": prompt.tokens}
             
         except Exception as e:
             print(f"Error with Gemini AI: {e}")
@@ -263,49 +322,56 @@ Provide comprehensive analysis. Respond ONLY with valid JSON (no markdown):
                 "top_recommendations": ["AI service error"]
             }
     
-    def ask_question(self, question, context_data):
+    def question_prompt(self, question, context_data):
         """
-        Ask Gemini AI any question about your project
+        Build the encoded prompt for ask_question
+        context_data holds "budget" and "schedule" rows
         """
-        if not self.client:
-            return "Gemini AI not configured. Please add GEMINI_API_KEY to .env file."
-        
-        try:
-            prompt = f"""
+        budget_csv, schedule_csv = encode_tables([
+            (budget_features(context_data.get('budget') or []), BUDGET_COLUMNS),
+            (schedule_features(context_data.get('schedule') or []), SCHEDULE_COLUMNS)
+        ])
+        return EncodedPrompt(f"""
 You are a film production expert. Answer this question based on the project data.
 
 Question: {question}
 
-Project Data:
-{json.dumps(context_data, indent=2)}
-
+Budget Data (CSV):
+{budget_csv}
+Schedule Data (CSV):
+{schedule_csv}
 Provide a clear, concise, actionable answer (2-3 sentences).
-"""
-            
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
-            
-            return response.text
-            
-        except Exception as e:
-            return f"Error: {str(e)}"
+""")
     
-    def generate_report(self, project_data):
+    def report_prompt(self, project_data):
         """
-        Generate executive report using Gemini AI
+        Build the encoded prompt for generate_report
+        project_data holds "project", "budget", "schedule" and "purchase_orders",
+        plus optional precomputed "kpis"
         """
-        if not self.client:
-            return "Gemini AI not configured. Please add GEMINI_API_KEY to .env file."
-        
-        try:
-            prompt = f"""
+        budget_csv, schedule_csv, po_csv = encode_tables([
+            (budget_features(project_data.get('budget') or []), BUDGET_COLUMNS),
+            (schedule_features(project_data.get('schedule') or []), SCHEDULE_COLUMNS),
+            (po_features(project_data.get('purchase_orders') or []), PO_COLUMNS)
+        ])
+        # Department detail is already in the budget table
+        kpis = project_data.get('kpis') or {}
+        headline_kpis = {k: v for k, v in kpis.items() if k != 'variance_by_dept'}
+        return EncodedPrompt(f"""
 You are a film production executive. Write a professional project status report.
 
-Project Data:
-{json.dumps(project_data, indent=2)}
+Project:
+{to_compact_json(project_data.get('project'))}
+
+KPIs (burn_rate in %):
+{to_compact_json(headline_kpis)}
 
+Budget (CSV):
+{budget_csv}
+Schedule (CSV):
+{schedule_csv}
+Purchase Orders (CSV):
+{po_csv}
 Write a concise executive summary (3-4 paragraphs) covering:
 1. Current project status
 2. Budget performance
@@ -313,17 +379,102 @@ Write a concise executive summary (3-4 paragraphs) covering:
 4. Key risks and recommendations
 
 Use professional business language.
-"""
-            
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt
-            )
+""")
+    
+    def ask_question(self, question, context_data, prompt=None):
+        """
+        Ask Gemini AI any question about your project
+        Pass a prebuilt question_prompt() to reuse its token count
+        """
+        if not self.client:
+            return "Gemini AI not configured. Please add GEMINI_API_KEY to .env file."
+        
+        try:
+            prompt = prompt or self.question_prompt(question, context_data)
+            return self._generate(prompt.text)
             
-            return response.text
+        except Exception as e:
+            return f"Error: {str(e)}"
+    
+    def generate_report(self, project_data, refresh=False, prompt=None, raise_errors=False):
+        """
+        Generate executive report using Gemini AI
+        Pass a prebuilt report_prompt() to reuse its token count;
+        raise_errors=True raises instead of returning the error as the report
+        """
+        if not self.client:
+            if raise_errors:
+                raise RuntimeError("Gemini AI not configured. Please add GEMINI_API_KEY to .env file.")
+            return "Gemini AI not configured. Please add GEMINI_API_KEY to .env file."
+        
+        try:
+            prompt = prompt or self.report_prompt(project_data)
+            return self._cached_call("report", prompt.text, parse_json=False, refresh=refresh)
             
         except Exception as e:
+            if raise_errors:
+                raise
             return f"Error generating report: {str(e)}"
+    
+    def _generate_stream(self, prompt):
+        """
+        Streaming Gemini completion, yields text chunks as they arrive
+        Holds a concurrency slot until the stream is finished
+        """
+        queued = time.perf_counter()
+        if not self.limiter.acquire(timeout=GEMINI_QUEUE_TIMEOUT):
+            record_gemini_call("stream", queued, 0.0, len(prompt), "busy", time.perf_counter() - queued)
+            raise RuntimeError("Gemini AI is busy, try again shortly")
+        started = time.perf_counter()
+        first_chunk = None
+        outcome = "error"
+        try:
+            for chunk in self.client.models.generate_content_stream(
+                model=self.model,
+                contents=prompt
+            ):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                if chunk.text:
+                    yield chunk.text
+            outcome = "ok"
+        finally:
+            self.limiter.release()
+            record_gemini_call("stream", started, time.perf_counter() - started, len(prompt), outcome,
+                               started - queued, first_chunk)
+    
+    def stream_answer(self, question, context_data):
+        """
+        Streaming variant of ask_question
+        """
+        if not self.client:
+            yield "Gemini AI not configured. Please add GEMINI_API_KEY to .env file."
+            return
+        
+        yield from self._generate_stream(self.question_prompt(question, context_data).text)
+    
+    def stream_report(self, project_data, refresh=False):
+        """
+        Streaming variant of generate_report
+        A cached report is sent as one chunk; a fresh one is cached once complete
+        """
+        if not self.client:
+            yield "Gemini AI not configured. Please add GEMINI_API_KEY to .env file."
+            return
+        
+        prompt = self.report_prompt(project_data).text
+        key = make_key(self.model, "report", prompt)
+        if not refresh:
+            cached = ai_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        for text in self._generate_stream(prompt):
+            chunks.append(text)
+            yield text
+        ai_cache.set(key, "".join(chunks))
 
 
 # Create singleton instance
@@ -333,6 +484,7 @@ gemini_service = GeminiAIService()
 # Test function
 def test_gemini():
     """Test Gemini connection"""
+    client = gemini_client.get()
     if not client:
         print("❌ Gemini client not initialized. Check GEMINI_API_KEY in .env")
         return False
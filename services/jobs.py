@@ -0,0 +1,145 @@
+# ============================================
+# FILE: services/jobs.py
+# ============================================
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.processes import process_tag, process_alive
+
+# Background workers for long-running AI jobs, and how long results are kept
+AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "2"))
+AI_JOB_TTL_SECONDS = float(os.getenv("AI_JOB_TTL_SECONDS", "86400"))
+AI_JOB_DB_PATH = os.getenv("AI_JOB_DB_PATH", ".cache/ai_jobs.sqlite3")
+
+
+class JobQueue:
+    """
+    In-process job runner: submit() returns a job ID immediately, a worker
+    pool runs the function, and the result is persisted to SQLite so it
+    can be fetched later (until it expires)
+
+    Several worker processes can share one job file. Each job records the
+    process running it, and a queued or running job is only marked failed
+    once that process has exited.
+    """
+
+    def __init__(self, path: str = AI_JOB_DB_PATH, workers: int = AI_JOB_WORKERS, ttl: float = AI_JOB_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "create table if not exists jobs ("
+                " id text primary key,"
+                " kind text not null,"
+                " status text not null,"
+                " result text,"
+                " error text,"
+                " created_at real not null,"
+                " updated_at real not null,"
+                " expires_at real not null,"
+                " owner text)"
+            )
+            columns = {row[1] for row in self._conn.execute("pragma table_info(jobs)")}
+            if "owner" not in columns:
+                self._conn.execute("alter table jobs add column owner text")
+            self._fail_orphaned()
+        return self._conn
+
+    def _fail_orphaned(self):
+        """
+        Mark failed the queued / running jobs whose process has exited; they will never finish
+        """
+        pending = self._conn.execute(
+            "select id, owner from jobs where status in ('queued', 'running')"
+        ).fetchall()
+        orphaned = [(job_id,) for job_id, owner in pending if not process_alive(owner)]
+        if orphaned:
+            self._conn.executemany(
+                "update jobs set status = 'failed', error = 'Interrupted by restart' where id = ?", orphaned
+            )
+        self._conn.commit()
+
+    def _update(self, job_id: str, **fields):
+        fields['updated_at'] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f"update jobs set {columns} where id = ?", (*fields.values(), job_id))
+            conn.commit()
+
+    def submit(self, kind: str, func, *args, **kwargs):
+        """
+        Queue func(*args, **kwargs) and return the new job ID
+        The function's return value must be JSON-serializable
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("delete from jobs where expires_at < ?", (now,))
+            conn.execute(
+                "insert into jobs (id, kind, status, created_at, updated_at, expires_at, owner)"
+                " values (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, now, now, now + self.ttl, process_tag())
+            )
+            conn.commit()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ai-job")
+            self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        self._update(job_id, status="running")
+        try:
+            result = func(*args, **kwargs)
+            self._update(job_id, status="done", result=json.dumps(result, default=str))
+        except Exception as e:
+            print(f"Error running job {job_id}: {e}")
+            self._update(job_id, status="failed", error=str(e))
+
+    def get(self, job_id: str):
+        """
+        Job status and result, or None if unknown or expired
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "select id, kind, status, result, error, created_at, updated_at, expires_at from jobs where id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None or row[7] < time.time():
+            return None
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] is not None else None,
+            "error": row[4],
+            "created_at": row[5],
+            "updated_at": row[6],
+            "expires_at": row[7]
+        }
+
+    def shutdown(self, wait: bool = True):
+        # Wait outside the lock: running jobs take it to record their result
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+# Shared instance for AI report jobs
+job_queue = JobQueue()
@@ -3,71 +3,125 @@
 # ============================================
 
 from config.database import get_db
+from services.aggregates import sum_budget, budget_by_dept, count_by_status, sum_pos
+from services.kpi_store import kpi_store
 
-def calculate_kpis(project_id: str):
+# The one KPI engine. Every endpoint that reports KPIs loads a project
+# dataset once and passes it to compute_kpis():
+#
+#   {"budget":   {"line_count", "totals": {planned, committed, actual}, "by_department": [...]},
+#    "schedule": {"total_days", "status_breakdown": {status: days}},
+#    "pos":      {"total_count", "total_amount"}}          (optional)
+#
+# kpi_store.get() returns this shape; dataset_from_rows() builds it from
+# rows a caller already loaded.
+
+
+def dataset_from_rows(budget_rows, schedule_rows, po_rows=None):
+    """
+    Build a KPI dataset from raw budget / schedule / PO rows
     """
-    Calculate Key Performance Indicators
-    - Burn Rate: How fast money is being spent
+    dataset = {
+        "budget": {
+            "line_count": len(budget_rows),
+            "totals": sum_budget(budget_rows),
+            "by_department": budget_by_dept(budget_rows)
+        },
+        "schedule": {
+            "total_days": len(schedule_rows),
+            "status_breakdown": count_by_status(schedule_rows)
+        }
+    }
+    if po_rows is not None:
+        dataset['pos'] = sum_pos(po_rows)
+    return dataset
+
+
+def compute_kpis(dataset):
+    """
+    Calculate Key Performance Indicators from a project dataset
+    - Burn Rate: percentage of the planned budget spent
     - CPI (Cost Performance Index): Planned vs Actual
-    - SPI (Schedule Performance Index): Planned vs Actual time
+    - SPI (Schedule Performance Index): share of schedule days completed
     - Variance by Department
+    
+    Returns None when the project has no budget lines
+    """
+    budget, schedule = dataset['budget'], dataset['schedule']
+    if not budget['line_count']:
+        return None
+    
+    # Calculate totals
+    total_planned = budget['totals']['planned']
+    total_committed = budget['totals']['committed']
+    total_actual = budget['totals']['actual']
+    
+    # Burn rate (percentage of budget spent)
+    burn_rate = (total_actual / total_planned * 100) if total_planned > 0 else 0
+    
+    # Cost Performance Index (CPI)
+    # CPI > 1 = under budget, CPI < 1 = over budget
+    cpi = total_planned / total_actual if total_actual > 0 else 0
+    
+    # Variance by department
+    variance_by_dept = {}
+    for dept in budget['by_department']:
+        variance_by_dept[dept['dept']] = {
+            "planned": dept['planned'],
+            "actual": dept['actual'],
+            "variance": dept['variance'],
+            "percent_spent": (dept['actual'] / dept['planned'] * 100) if dept['planned'] > 0 else 0
+        }
+    
+    # Get schedule performance
+    status_breakdown = schedule['status_breakdown']
+    schedule_stats = {
+        "total_days": schedule['total_days'],
+        "completed": status_breakdown.get('completed', 0),
+        "delayed": status_breakdown.get('delayed', 0)
+    }
+    
+    # Schedule Performance Index (SPI)
+    spi = (schedule_stats['completed'] / schedule_stats['total_days']) if schedule_stats['total_days'] > 0 else 0
+    
+    return {
+        "burn_rate": round(burn_rate, 2),
+        "burn_ratio": round(total_actual / total_planned, 2) if total_planned > 0 else 0,
+        "total_planned": total_planned,
+        "total_committed": total_committed,
+        "total_actual": total_actual,
+        "variance": total_planned - total_actual,
+        "cpi": round(cpi, 2),
+        "spi": round(spi, 2),
+        "variance_by_dept": variance_by_dept,
+        "schedule_stats": schedule_stats
+    }
+
+
+def report_view(kpis):
+    """
+    The /reports/kpis response: burn rate as a ratio and department variance only
+    """
+    return {
+        "burn_rate": kpis['burn_ratio'],
+        "total_planned": kpis['total_planned'],
+        "total_actual": kpis['total_actual'],
+        "variance": kpis['variance'],
+        "variance_by_dept": {dept: d['variance'] for dept, d in kpis['variance_by_dept'].items()},
+        "CPI": kpis['cpi'],
+        "SPI": kpis['spi']
+    }
+
+
+async def calculate_kpis(project_id: str):
+    """
+    KPIs for one project from the shared KPI store
     """
     try:
-        db = get_db()
-        
-        # Get budget data
-        budgets = db.table('budgets').select("*").eq('project_id', project_id).execute()
-        
-        if not budgets.data:
+        kpis = compute_kpis(await kpi_store.get(get_db(), project_id))
+        if kpis is None:
             return {"error": "No budget data found"}
-        
-        # Calculate totals
-        total_planned = sum(float(b['planned']) for b in budgets.data)
-        total_committed = sum(float(b['committed']) for b in budgets.data)
-        total_actual = sum(float(b['actual']) for b in budgets.data)
-        
-        # Burn rate (percentage of budget spent)
-        burn_rate = (total_actual / total_planned * 100) if total_planned > 0 else 0
-        
-        # Cost Performance Index (CPI)
-        # CPI > 1 = under budget, CPI < 1 = over budget
-        cpi = total_planned / total_actual if total_actual > 0 else 0
-        
-        # Variance by department
-        variance_by_dept = {}
-        for budget in budgets.data:
-            dept = budget['dept']
-            variance = float(budget['planned']) - float(budget['actual'])
-            variance_by_dept[dept] = {
-                "planned": float(budget['planned']),
-                "actual": float(budget['actual']),
-                "variance": variance,
-                "percent_spent": (float(budget['actual']) / float(budget['planned']) * 100) if float(budget['planned']) > 0 else 0
-            }
-        
-        # Get schedule performance
-        schedules = db.table('schedules').select("*").eq('project_id', project_id).execute()
-        
-        schedule_stats = {
-            "total_days": len(schedules.data) if schedules.data else 0,
-            "completed": sum(1 for s in schedules.data if s['status'] == 'completed') if schedules.data else 0,
-            "delayed": sum(1 for s in schedules.data if s['status'] == 'delayed') if schedules.data else 0
-        }
-        
-        # Schedule Performance Index (SPI)
-        spi = (schedule_stats['completed'] / schedule_stats['total_days']) if schedule_stats['total_days'] > 0 else 0
-        
-        return {
-            "burn_rate": round(burn_rate, 2),
-            "total_planned": total_planned,
-            "total_committed": total_committed,
-            "total_actual": total_actual,
-            "variance": total_planned - total_actual,
-            "cpi": round(cpi, 2),
-            "spi": round(spi, 2),
-            "variance_by_dept": variance_by_dept,
-            "schedule_stats": schedule_stats
-        }
-        
+        return kpis
+    
     except Exception as e:
-        return {"error": f"Error calculating KPIs: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Error calculating KPIs: {str(e)}"}
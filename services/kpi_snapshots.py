@@ -0,0 +1,245 @@
+# ============================================
+# FILE: services/kpi_snapshots.py
+# ============================================
+
+import os
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from config.database import get_db, run_query, select_all
+from services.portfolio_kpis import get_portfolio_kpis
+from services.analytics_replica import get_analytics_db
+
+# UTC time of day of the daily snapshot run, HH:MM ("" = only on demand); rows per upsert request
+KPI_SNAPSHOT_TIME = os.getenv("KPI_SNAPSHOT_TIME", "02:00")
+KPI_SNAPSHOT_BATCH_SIZE = int(os.getenv("KPI_SNAPSHOT_BATCH_SIZE", "500"))
+# Seconds before a failed scheduled run is tried again (until the day is over)
+KPI_SNAPSHOT_RETRY = float(os.getenv("KPI_SNAPSHOT_RETRY", "300"))
+# Longest trend series returned before downsampling
+TREND_MAX_POINTS = int(os.getenv("TREND_MAX_POINTS", "180"))
+
+# Project-level rows use an empty department
+PROJECT_DEPT = ""
+# kpi_snapshots row a worker inserts to claim a day's scheduled run
+LOCK_PROJECT_ID = "__snapshot_run__"
+TREND_METRICS = ("burn_rate", "cpi", "spi", "planned", "actual", "variance")
+
+
+def snapshot_rows(kpis: dict, day: str):
+    """
+    Flatten portfolio KPIs into one row per project plus one per department
+    """
+    rows = []
+    for project_id, k in kpis['projects'].items():
+        rows.append({
+            "project_id": project_id,
+            "dept": PROJECT_DEPT,
+            "day": day,
+            "burn_rate": k['burn_rate'],
+            "cpi": k['cpi'],
+            "spi": k['spi'],
+            "planned": k['total_planned'],
+            "actual": k['total_actual'],
+            "variance": k['variance']
+        })
+        for dept, d in k.get('variance_by_dept', {}).items():
+            rows.append({
+                "project_id": project_id,
+                "dept": dept,
+                "day": day,
+                "burn_rate": round(d['percent_spent'], 2),
+                "cpi": round(d['planned'] / d['actual'], 2) if d['actual'] > 0 else 0,
+                "spi": None,
+                "planned": d['planned'],
+                "actual": d['actual'],
+                "variance": d['variance']
+            })
+    return rows
+
+
+async def take_snapshots(db, project_ids=None, day: str = None, source=None):
+    """
+    Store today's KPIs for the given projects (every active project by default)
+    Re-running on the same day overwrites that day's rows
+    Project data is read from source (e.g. the analytics replica) if given;
+    the snapshot rows are always written to db
+    """
+    day = day or datetime.utcnow().date().isoformat()
+    source = source or db
+    if project_ids is None:
+        project_ids = [str(p['id']) for p in await select_all(source, 'projects', status='active')]
+    if not project_ids:
+        return {"day": day, "projects": 0, "rows": 0}
+    
+    kpis = await get_portfolio_kpis(source, project_ids)
+    rows = snapshot_rows(kpis, day)
+    
+    await asyncio.gather(*(
+        run_query(db.table('kpi_snapshots').upsert(
+            rows[i:i + KPI_SNAPSHOT_BATCH_SIZE], on_conflict="project_id,dept,day", returning="minimal"
+        ))
+        for i in range(0, len(rows), KPI_SNAPSHOT_BATCH_SIZE)
+    ))
+    return {"day": day, "projects": len(kpis['projects']), "rows": len(rows)}
+
+
+def downsample(rows, metrics, max_points: int = TREND_MAX_POINTS):
+    """
+    Average consecutive rows into at most max_points buckets
+    Each bucket is labelled with its first day; missing values are ignored
+    """
+    if len(rows) <= max_points:
+        return [{"day": r['day'], **{m: r.get(m) for m in metrics}} for r in rows]
+    
+    import numpy as np
+    
+    bounds = np.linspace(0, len(rows), max_points + 1).astype(int)
+    values = np.array([[np.nan if r.get(m) is None else float(r[m]) for m in metrics] for r in rows])
+    
+    points = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        bucket = values[start:end]
+        counts = (~np.isnan(bucket)).sum(axis=0)
+        sums = np.nansum(bucket, axis=0)
+        means = [round(float(s / c), 4) if c else None for s, c in zip(sums, counts)]
+        points.append({"day": rows[start]['day'], **dict(zip(metrics, means))})
+    return points
+
+
+async def get_trend(db, project_id: str, metrics, start: str = None, end: str = None, dept: str = PROJECT_DEPT,
+                    max_points: int = TREND_MAX_POINTS):
+    """
+    KPI series for one project (or one of its departments) between two days
+    """
+    query = db.table('kpi_snapshots').select("day," + ",".join(metrics))
+    query = query.eq('project_id', project_id).eq('dept', dept)
+    if start:
+        query = query.gte('day', start)
+    if end:
+        query = query.lte('day', end)
+    result = await run_query(query.order('day'))
+    
+    points = downsample(result.data, metrics, max_points)
+    return {
+        "project_id": project_id,
+        "dept": dept or None,
+        "snapshots": len(result.data),
+        "downsampled": len(points) < len(result.data),
+        "points": points
+    }
+
+
+def next_run(at: str, now: datetime):
+    """
+    The next UTC datetime after now whose time of day is at (HH:MM)
+    """
+    hour, minute = (int(part) for part in at.split(":"))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
+
+
+def _is_duplicate_key(e):
+    # Postgres unique_violation, SQLite backend
+    text = str(e)
+    return any(marker in text for marker in ("23505", "duplicate key", "UNIQUE constraint failed"))
+
+
+async def claim_run(db, day: str):
+    """
+    Claim the scheduled run for a day across workers: the first worker to
+    insert the lock row in kpi_snapshots wins, the others get a key conflict
+    Any other error is raised, so the day is retried
+    """
+    try:
+        await run_query(db.table('kpi_snapshots').insert(
+            {"project_id": LOCK_PROJECT_ID, "dept": PROJECT_DEPT, "day": day}, returning="minimal"
+        ))
+        return True
+    except Exception as e:
+        if not _is_duplicate_key(e):
+            raise
+        print(f"KPI snapshot run for {day} already claimed by another worker")
+        return False
+
+
+async def release_run(db, day: str):
+    """Give up a claimed day after a failed run so a retry can claim it again"""
+    await run_query(
+        db.table('kpi_snapshots').delete().eq('project_id', LOCK_PROJECT_ID).eq('dept', PROJECT_DEPT).eq('day', day)
+    )
+
+
+async def run_scheduled(db, source, day: str):
+    """
+    The scheduled snapshot for a day, taken by whichever worker claims it first
+    Returns None if another worker already claimed the day
+    """
+    if not await claim_run(db, day):
+        return None
+    try:
+        return await take_snapshots(db, day=day, source=source)
+    except Exception:
+        await release_run(db, day)
+        raise
+
+
+class SnapshotScheduler:
+    """
+    Background thread that takes the daily snapshot at a fixed UTC time
+
+    Every worker runs a scheduler, but only the one that claims the day
+    (see claim_run) takes the snapshot. A worker starting after the day's
+    run time takes a missed snapshot, unless another worker already has.
+    A failed run is retried every KPI_SNAPSHOT_RETRY seconds until the
+    UTC day is over.
+    """
+
+    def __init__(self, at: str = KPI_SNAPSHOT_TIME):
+        self.at = at
+        self.last_run = None
+        self.last_result = None
+        self.next_run = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.at and self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="kpi-snapshots", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self):
+        now = datetime.utcnow()
+        run_at = next_run(self.at, now)
+        # Today's run time has passed: take it now if no worker has (claiming is cheap once it's taken)
+        if (run_at - timedelta(days=1)).date() == now.date():
+            run_at -= timedelta(days=1)
+        while not self._stopping.is_set():
+            self.next_run = run_at.isoformat()
+            if self._stopping.wait(max(0.0, (run_at - datetime.utcnow()).total_seconds())):
+                break
+            try:
+                result = asyncio.run(run_scheduled(get_db(), get_analytics_db(), run_at.date().isoformat()))
+                if result is not None:
+                    self.last_result = result
+                    self.last_run = datetime.utcnow().isoformat()
+            except Exception as e:
+                print(f"Error taking KPI snapshots: {e}")
+                retry_at = datetime.utcnow() + timedelta(seconds=KPI_SNAPSHOT_RETRY)
+                if retry_at.date() == run_at.date():
+                    run_at = retry_at
+                    continue
+            run_at = next_run(self.at, max(run_at, datetime.utcnow()))
+
+    def stats(self):
+        return {"at": self.at, "next_run": self.next_run, "last_run": self.last_run, "last_result": self.last_result}
+
+
+# Shared scheduler, started with the app
+snapshot_scheduler = SnapshotScheduler()
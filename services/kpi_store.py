@@ -0,0 +1,296 @@
+# ============================================
+# FILE: services/kpi_store.py
+# ============================================
+
+import os
+import copy
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from config.database import get_db, run_query, select_in
+from services.aggregates import get_budget_aggregates, get_schedule_aggregates, get_po_aggregates
+from services import event_bus
+
+# Seconds between polls of the events table for writes made by other workers (0 = off)
+KPI_EVENT_POLL_INTERVAL = float(os.getenv("KPI_EVENT_POLL_INTERVAL", "5"))
+# Sequence numbers behind the newest seen that each poll reads again, to catch
+# events whose insert committed after a later one
+KPI_EVENT_LOOKBACK = int(os.getenv("KPI_EVENT_LOOKBACK", "100"))
+# Seconds a seeded project state is used before it is reseeded, and the most projects kept
+# Budgets change without write events, so this bounds how stale budget KPIs can be
+KPI_STORE_TTL_SECONDS = float(os.getenv("KPI_STORE_TTL_SECONDS", "30"))
+KPI_STORE_MAX_PROJECTS = int(os.getenv("KPI_STORE_MAX_PROJECTS", "1024"))
+
+
+class KPIStore:
+    """
+    Per-project KPI inputs kept in memory and updated incrementally
+
+    A project's state is seeded from the aggregate queries, then kept
+    current by applying write events, so KPI reads are lookups instead of
+    scans. Event types the store doesn't understand drop the project's
+    state so it is reseeded on the next read; rebuild() does the same on demand.
+
+    Like the project cache, states expire after a TTL (budget edits made
+    outside the app emit no events) and the least recently used projects
+    are evicted past max_projects.
+    """
+
+    def __init__(self, ttl: float = KPI_STORE_TTL_SECONDS, max_projects: int = KPI_STORE_MAX_PROJECTS):
+        self.ttl = ttl
+        self.max_projects = max_projects
+        self._states = OrderedDict()  # project_id -> state, least recently used first
+        self._expires = {}  # project_id -> monotonic time the state must be reseeded
+        self._versions = {}  # project_id -> bumped by every event, detects races with seeding
+        self._lock = threading.Lock()
+        self.seeds = 0
+        self.applied = 0
+        self.evictions = 0
+
+    async def _seed(self, db, project_id: str):
+        # Read before the aggregates: events up to this seq are already in them
+        latest = await run_query(db.table('events').select("seq").order('seq', desc=True).limit(1))
+        budget, schedule, pos = await asyncio.gather(
+            get_budget_aggregates(db, project_id),
+            get_schedule_aggregates(db, project_id),
+            get_po_aggregates(db, project_id)
+        )
+        po_rows = await run_query(db.table('pos').select("id").eq('project_id', project_id))
+        invoices = await select_in(db, 'invoices', 'po_id', [p['id'] for p in po_rows.data], "amount")
+        return {
+            "budget": budget,
+            "schedule": schedule,
+            "pos": pos,
+            "invoices": {
+                "total_count": len(invoices),
+                "total_amount": sum(float(i['amount']) for i in invoices)
+            },
+            "seeded_at": datetime.utcnow().isoformat(),
+            "seeded_seq": int(latest.data[0]['seq'] or 0) if latest.data else 0
+        }
+
+    async def get(self, db, project_id: str):
+        """
+        Current KPI inputs for a project (a copy, safe to modify)
+        """
+        project_id = str(project_id)
+        for _ in range(3):
+            with self._lock:
+                state = self._states.get(project_id)
+                if state is not None and self._expires.get(project_id, 0) >= time.monotonic():
+                    self._states.move_to_end(project_id)
+                    return copy.deepcopy(state)
+                version = self._versions.get(project_id, 0)
+
+            state = await self._seed(db, project_id)
+            with self._lock:
+                self.seeds += 1
+                # Only keep the seed if no event landed while it was loading
+                if self._versions.get(project_id, 0) == version:
+                    self._store(project_id, state)
+                    return copy.deepcopy(state)
+        return copy.deepcopy(state)
+
+    def _store(self, project_id: str, state):
+        self._states[project_id] = state
+        self._states.move_to_end(project_id)
+        self._expires[project_id] = time.monotonic() + self.ttl
+        while len(self._states) > self.max_projects:
+            evicted, _ = self._states.popitem(last=False)
+            self._expires.pop(evicted, None)
+            self.evictions += 1
+
+    def _drop(self, project_id: str):
+        self._states.pop(project_id, None)
+        self._expires.pop(project_id, None)
+
+    def clear(self):
+        """
+        Forget every project's state; each is reseeded on its next read
+        """
+        with self._lock:
+            for project_id in list(self._states):
+                self._versions[project_id] = self._versions.get(project_id, 0) + 1
+            self._states.clear()
+            self._expires.clear()
+
+    async def rebuild(self, db, project_id: str = None):
+        """
+        Reseed one project, or every project currently held, from the database
+        Reconciles any drift between the incremental state and the tables
+        """
+        with self._lock:
+            project_ids = [str(project_id)] if project_id else list(self._states)
+            for pid in project_ids:
+                self._drop(pid)
+                self._versions[pid] = self._versions.get(pid, 0) + 1
+        await asyncio.gather(*(self.get(db, pid) for pid in project_ids))
+        return project_ids
+
+    def apply(self, event: dict):
+        """
+        Fold one event into the project's state
+        """
+        project_id = str(event.get('project_id'))
+        payload = event.get('payload_json') or {}
+        with self._lock:
+            self._versions[project_id] = self._versions.get(project_id, 0) + 1
+            state = self._states.get(project_id)
+            if state is None:
+                return
+            if event.get('seq') is not None and int(event['seq']) <= state.get('seeded_seq', 0):
+                # Tailed late, but committed before the seed read the tables
+                return
+            if not _apply(state, event.get('type'), payload):
+                # Unknown effect on the KPIs: reseed on the next read
+                self._drop(project_id)
+            self.applied += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "projects": len(self._states),
+                "max_projects": self.max_projects,
+                "ttl_seconds": self.ttl,
+                "seeds": self.seeds,
+                "events_applied": self.applied,
+                "evictions": self.evictions
+            }
+
+
+def _apply(state, event_type: str, payload: dict):
+    """Returns False if the event type isn't handled incrementally"""
+    if event_type in ("po_created", "pos_imported"):
+        pos = state['pos']
+        pos['total_count'] += int(payload.get('count', 1))
+        pos['total_amount'] += float(payload.get('total_amount', payload.get('amount', 0)))
+        return True
+
+    if event_type in ("invoice_created", "invoices_imported"):
+        invoices = state['invoices']
+        invoices['total_count'] += int(payload.get('count', 1))
+        invoices['total_amount'] += float(payload.get('total_amount', payload.get('amount', 0)))
+        return True
+
+    if event_type == "schedule_imported":
+        schedule = state['schedule']
+        schedule['total_days'] += int(payload.get('count', 0))
+        for status, count in (payload.get('status_breakdown') or {}).items():
+            schedule['status_breakdown'][status] = schedule['status_breakdown'].get(status, 0) + count
+        return True
+
+    if event_type == "schedule_status_changed":
+        breakdown = state['schedule']['status_breakdown']
+        old, new = payload.get('from'), payload.get('to')
+        if old in breakdown:
+            breakdown[old] -= 1
+            if breakdown[old] <= 0:
+                del breakdown[old]
+        breakdown[new] = breakdown.get(new, 0) + 1
+        return True
+
+    return False
+
+
+class EventTailer:
+    """
+    Polls the events table and applies events written by other workers
+
+    Events are read in seq order (assigned by the database at insert, so
+    events the buffered writer inserts late are still picked up) and
+    deduplicated on the event_id given to them by log_event. Events this
+    process logged itself were applied already and are skipped. Events
+    without an event_id (older rows, old spill files, other writers) are
+    applied only the first time they are read, when their seq is past the
+    previous watermark.
+    """
+
+    def __init__(self, store: KPIStore, interval: float = KPI_EVENT_POLL_INTERVAL, batch: int = 1000,
+                 lookback: int = KPI_EVENT_LOOKBACK):
+        self.store = store
+        self.interval = interval
+        self.batch = batch
+        self.lookback = lookback
+        self.watermark = None  # highest seq seen; None until the first poll
+        self._seen = OrderedDict()  # event_id of events applied or logged here
+        self._seen_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def remember(self, event: dict):
+        """
+        Record an event as applied; returns False if it already was
+        """
+        event_id = event.get('event_id')
+        if event_id is None:
+            return True
+        with self._seen_lock:
+            if event_id in self._seen:
+                return False
+            self._seen[event_id] = True
+            while len(self._seen) > max(10000, 10 * self.lookback):
+                self._seen.popitem(last=False)
+        return True
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="kpi-event-tailer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error polling events: {e}")
+
+    def poll(self):
+        """
+        Apply new events; returns how many were applied
+        The first poll only records where the events table ends
+        """
+        db = get_db()
+        if self.watermark is None:
+            latest = db.table('events').select("seq").order('seq', desc=True).limit(1).execute().data
+            self.watermark = int(latest[0]['seq'] or 0) if latest else 0
+            return 0
+
+        previous = self.watermark
+        applied, cursor = 0, max(0, self.watermark - self.lookback)
+        while True:
+            page = (
+                db.table('events').select("event_id,seq,project_id,type,payload_json")
+                .gt('seq', cursor).order('seq').limit(self.batch).execute().data
+            )
+            for event in page:
+                cursor = int(event['seq'])
+                self.watermark = max(self.watermark, cursor)
+                if event.get('event_id') is None and cursor <= previous:
+                    continue
+                if self.remember(event):
+                    self.store.apply(event)
+                    applied += 1
+            if len(page) < self.batch:
+                return applied
+
+
+# Shared store, fed by every event this process logs
+kpi_store = KPIStore()
+event_tailer = EventTailer(kpi_store)
+
+
+def _on_event(event: dict):
+    event_tailer.remember(event)
+    kpi_store.apply(event)
+
+
+event_bus.subscribe(_on_event)
@@ -0,0 +1,130 @@
+# ============================================
+# FILE: services/portfolio_kpis.py
+# ============================================
+
+import asyncio
+from config.database import select_in
+
+# pandas / numpy are imported inside the functions: they add noticeably to
+# app startup and are only needed by the portfolio endpoints
+
+BUDGET_COLUMNS = ["project_id", "dept", "planned", "committed", "actual"]
+SCHEDULE_COLUMNS = ["project_id", "status"]
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    """Element-wise numerator / denominator, 0 where the denominator isn't positive"""
+    import numpy as np
+    
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.zeros_like(numerator)
+    np.divide(numerator * scale, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def budget_frame(rows):
+    import pandas as pd
+    
+    frame = pd.DataFrame.from_records(rows, columns=BUDGET_COLUMNS)
+    # Categorical keys are factorized once and make every group-by an integer operation
+    frame['project_id'] = frame['project_id'].astype(str).astype("category")
+    frame['dept'] = frame['dept'].astype("category")
+    frame[["planned", "committed", "actual"]] = frame[["planned", "committed", "actual"]].astype(float)
+    return frame
+
+
+def schedule_frame(rows):
+    import pandas as pd
+    
+    frame = pd.DataFrame.from_records(rows, columns=SCHEDULE_COLUMNS)
+    frame['project_id'] = frame['project_id'].astype(str).astype("category")
+    # Days without a status count as 'unknown', like count_by_status and the schedule_status_counts view
+    frame['status'] = frame['status'].fillna('unknown').astype("category")
+    return frame
+
+
+def compute_portfolio(budgets, schedules, include_departments: bool = True):
+    """
+    KPIs for every project in the budget_frame() / schedule_frame() frames
+    with vectorized group-bys. Same metrics and units as calculate_kpis
+    """
+    import pandas as pd
+    
+    totals = budgets.groupby('project_id', observed=True)[["planned", "committed", "actual"]].sum()
+    
+    # Schedule counts per project and status in one pass, aligned to the budget index
+    counts = schedules.groupby(['project_id', 'status'], observed=True).size().unstack(fill_value=0)
+    counts = counts.reindex(index=totals.index, fill_value=0)
+    days = pd.DataFrame({
+        "total_days": counts.sum(axis=1),
+        "completed": counts['completed'] if 'completed' in counts else 0,
+        "delayed": counts['delayed'] if 'delayed' in counts else 0
+    }, index=totals.index).fillna(0).astype(int)
+    
+    kpis = pd.DataFrame({
+        "burn_rate": _ratio(totals['actual'], totals['planned'], 100).round(2),
+        "total_planned": totals['planned'],
+        "total_committed": totals['committed'],
+        "total_actual": totals['actual'],
+        "variance": totals['planned'] - totals['actual'],
+        "cpi": _ratio(totals['planned'], totals['actual']).round(2),
+        "spi": _ratio(days['completed'], days['total_days']).round(2)
+    }, index=totals.index)
+    
+    # Convert to plain dicts in bulk; per-row Series access would dominate the runtime
+    projects = {}
+    for project_id, row, stats in zip(kpis.index, kpis.to_dict('records'), days.to_dict('records')):
+        row['schedule_stats'] = stats
+        projects[project_id] = row
+    
+    if include_departments:
+        depts = budgets.groupby(['project_id', 'dept'], observed=True)[["planned", "actual"]].sum()
+        depts['variance'] = depts['planned'] - depts['actual']
+        depts['percent_spent'] = _ratio(depts['actual'], depts['planned'], 100)
+        for project_id in projects:
+            projects[project_id]['variance_by_dept'] = {}
+        # Plain lists zip much faster than MultiIndex iteration or to_dict()
+        rows = zip(
+            depts.index.get_level_values(0).tolist(), depts.index.get_level_values(1).tolist(),
+            depts['planned'].tolist(), depts['actual'].tolist(),
+            depts['variance'].tolist(), depts['percent_spent'].tolist()
+        )
+        for project_id, dept, planned, actual, variance, percent_spent in rows:
+            projects[project_id]['variance_by_dept'][dept] = {
+                "planned": planned, "actual": actual, "variance": variance, "percent_spent": percent_spent
+            }
+    
+    planned, actual = float(totals['planned'].sum()), float(totals['actual'].sum())
+    total_days, completed = int(days['total_days'].sum()), int(days['completed'].sum())
+    portfolio = {
+        "project_count": len(projects),
+        "total_planned": planned,
+        "total_actual": actual,
+        "variance": planned - actual,
+        "burn_rate": round(actual / planned * 100, 2) if planned > 0 else 0,
+        "cpi": round(planned / actual, 2) if actual > 0 else 0,
+        "spi": round(completed / total_days, 2) if total_days > 0 else 0,
+        "over_budget": int((kpis['variance'] < 0).sum())
+    }
+    
+    return {"portfolio": portfolio, "projects": projects}
+
+
+async def get_portfolio_kpis(db, project_ids, include_departments: bool = True):
+    """
+    Load budgets and schedules for many projects in bulk and compute their KPIs
+    """
+    project_ids = list(dict.fromkeys(str(pid) for pid in project_ids))
+    budgets, schedules = await asyncio.gather(
+        select_in(db, 'budgets', 'project_id', project_ids, ",".join(BUDGET_COLUMNS)),
+        select_in(db, 'schedules', 'project_id', project_ids, ",".join(SCHEDULE_COLUMNS))
+    )
+    
+    # Frame building and group-bys are CPU work; keep them off the event loop
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        None, lambda: compute_portfolio(budget_frame(budgets), schedule_frame(schedules), include_departments)
+    )
+    result['no_budget'] = [pid for pid in project_ids if pid not in result['projects']]
+    return result
@@ -0,0 +1,83 @@
+# ============================================
+# FILE: services/project_bundle.py
+# ============================================
+
+import asyncio
+from config.database import get_db, run_query
+from services.ai_features import BUDGET_FEATURE_FIELDS, SCHEDULE_FEATURE_FIELDS, PO_FEATURE_FIELDS
+from services.kpi_calculator import dataset_from_rows
+
+# Columns loaded per table: enough for every consumer of the bundle
+BUNDLE_COLUMNS = {
+    "projects": "*",
+    "budgets": "id," + BUDGET_FEATURE_FIELDS,
+    "schedules": "id," + SCHEDULE_FEATURE_FIELDS,
+    "pos": "id," + PO_FEATURE_FIELDS
+}
+
+
+class ProjectBundle:
+    """
+    One project's rows, fetched lazily and at most once per request
+
+    Each table is loaded on first use; concurrent callers asking for the
+    same table share the in-flight query. load() fetches several tables
+    in parallel up front.
+
+    Used by the AI endpoints, which need the raw rows for their prompts.
+    The summary and KPI endpoints only need totals and read them from
+    kpi_store, which never loads the rows.
+    """
+
+    def __init__(self, project_id: str, db=None):
+        self.project_id = str(project_id)
+        self.db = db or get_db()
+        self._loads = {}
+        self.queries = 0
+
+    def _load(self, table: str):
+        if table not in self._loads:
+            self.queries += 1
+            key = 'id' if table == 'projects' else 'project_id'
+            query = self.db.table(table).select(BUNDLE_COLUMNS[table]).eq(key, self.project_id)
+            self._loads[table] = asyncio.ensure_future(run_query(query))
+        return self._loads[table]
+
+    async def rows(self, table: str):
+        return (await self._load(table)).data
+
+    async def load(self, *tables: str):
+        """
+        Fetch the given tables concurrently; returns their rows in order
+        """
+        return await asyncio.gather(*(self.rows(table) for table in tables))
+
+    async def project(self):
+        """The project row, or None if it doesn't exist"""
+        rows = await self.rows('projects')
+        return rows[0] if rows else None
+
+    async def budgets(self):
+        return await self.rows('budgets')
+
+    async def schedules(self):
+        return await self.rows('schedules')
+
+    async def pos(self):
+        return await self.rows('pos')
+
+    async def dataset(self):
+        """
+        KPI dataset built from the bundle's rows (see kpi_calculator)
+        """
+        budgets, schedules, pos = await self.load('budgets', 'schedules', 'pos')
+        return dataset_from_rows(budgets, schedules, pos)
+
+
+def get_project_bundle(project_id: str) -> ProjectBundle:
+    """
+    FastAPI dependency: the request's ProjectBundle for the {project_id} path parameter
+    FastAPI caches dependencies per request, so every Depends() in one
+    request receives the same bundle
+    """
+    return ProjectBundle(project_id)
@@ -0,0 +1,126 @@
+# ============================================
+# FILE: services/prompt_encoding.py
+# ============================================
+
+import io
+import os
+import csv
+import json
+
+# Token budget for the data embedded in one prompt
+GEMINI_PROMPT_TOKEN_BUDGET = int(os.getenv("GEMINI_PROMPT_TOKEN_BUDGET", "8000"))
+
+# Rough characters-per-token ratio for Gemini on English/CSV text
+CHARS_PER_TOKEN = 4
+
+# Never sample a table below this many tokens
+MIN_TABLE_TOKENS = 200
+
+
+def estimate_tokens(text: str):
+    """
+    Cheap local token estimate (no round-trip to the count_tokens API)
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def to_csv(rows, columns):
+    """
+    Compact columnar encoding: one header line, then one line per row
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_cell(row.get(col)) for col in columns])
+    return buffer.getvalue()
+
+
+def to_compact_json(value):
+    """JSON without indentation or spaces"""
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _cell(value):
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return "" if value is None else value
+
+
+def _summarize(rows, columns):
+    """
+    One-line digest of the full table: numeric totals and category counts
+    Keeps the aggregate picture intact when only a sample of rows is shown
+    """
+    parts = []
+    for col in columns:
+        values = [row.get(col) for row in rows if row.get(col) is not None]
+        if values and all(isinstance(v, (int, float)) for v in values):
+            if col != "day":
+                parts.append(f"{col} total={sum(values):.2f}")
+        elif values:
+            counts = {}
+            for v in values:
+                counts[v] = counts.get(v, 0) + 1
+            if len(counts) <= 10:
+                parts.append(f"{col} counts={to_compact_json(counts)}")
+    return "; ".join(parts)
+
+
+def _sample(rows, keep: int):
+    """Evenly spaced sample that always includes the first and last rows"""
+    if keep >= len(rows):
+        return rows
+    if keep <= 1:
+        return rows[:1]
+    step = (len(rows) - 1) / (keep - 1)
+    return [rows[round(i * step)] for i in range(keep)]
+
+
+def encode_table(rows, columns, max_tokens: int):
+    """
+    CSV-encode rows, sampling them down to fit max_tokens if necessary
+    """
+    text = to_csv(rows, columns)
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens or len(rows) <= 1:
+        return text
+
+    summary = f"# {len(rows)} rows, evenly sampled to fit; full-table {_summarize(rows, columns)}\n"
+    per_row = max(1, (tokens - estimate_tokens(",".join(columns))) / len(rows))
+    keep = int((max_tokens - estimate_tokens(summary)) / per_row)
+    while True:
+        text = summary + to_csv(_sample(rows, max(keep, 1)), columns)
+        if keep <= 1 or estimate_tokens(text) <= max_tokens:
+            return text
+        keep = int(keep * 0.9)
+
+
+def encode_tables(tables, budget: int = GEMINI_PROMPT_TOKEN_BUDGET):
+    """
+    Encode several (rows, columns) tables sharing one token budget
+    Each table gets a share proportional to its unsampled size
+
+    Returns the encoded CSV texts in the same order
+    """
+    raw = [to_csv(rows, columns) for rows, columns in tables]
+    sizes = [estimate_tokens(text) for text in raw]
+    total = sum(sizes)
+    if total <= budget:
+        return raw
+
+    encoded = []
+    for (rows, columns), size in zip(tables, sizes):
+        allowance = max(MIN_TABLE_TOKENS, int(budget * size / total))
+        encoded.append(encode_table(rows, columns, allowance))
+    return encoded
+
+
+class EncodedPrompt:
+    """
+    Final prompt text plus its estimated token count
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = estimate_tokens(text)
@@ -0,0 +1,377 @@
+"""
+Parity tests for the shared KPI engine
+
+The reference functions below are the formulas the two KPI implementations
+used before they were consolidated (calculate_kpis reported burn rate as a
+percentage and SPI; /reports/kpis reported burn rate as a ratio and CPI only).
+The engine, the portfolio engine and the incremental KPI store must all
+reproduce them, including when the store reads through the SQLite backend.
+"""
+
+import os
+import asyncio
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+
+import pytest
+
+from services.kpi_calculator import compute_kpis, dataset_from_rows, report_view
+from services.kpi_store import KPIStore
+from services.portfolio_kpis import budget_frame, schedule_frame, compute_portfolio
+from config.sqlite_db import SQLiteClient
+from utils.pagination import apply_keyset, decode_cursor, paginate
+
+
+# ----- Reference implementations -----
+
+def legacy_calculate_kpis(budgets, schedules):
+    if not budgets:
+        return {"error": "No budget data found"}
+
+    total_planned = sum(float(b['planned']) for b in budgets)
+    total_committed = sum(float(b['committed']) for b in budgets)
+    total_actual = sum(float(b['actual']) for b in budgets)
+
+    burn_rate = (total_actual / total_planned * 100) if total_planned > 0 else 0
+    cpi = total_planned / total_actual if total_actual > 0 else 0
+
+    depts = {}
+    for b in budgets:
+        dept = depts.setdefault(b['dept'], {"planned": 0.0, "actual": 0.0})
+        dept['planned'] += float(b['planned'])
+        dept['actual'] += float(b['actual'])
+    variance_by_dept = {
+        name: {
+            "planned": d['planned'],
+            "actual": d['actual'],
+            "variance": d['planned'] - d['actual'],
+            "percent_spent": (d['actual'] / d['planned'] * 100) if d['planned'] > 0 else 0
+        }
+        for name, d in depts.items()
+    }
+
+    schedule_stats = {
+        "total_days": len(schedules),
+        "completed": sum(1 for s in schedules if s['status'] == 'completed'),
+        "delayed": sum(1 for s in schedules if s['status'] == 'delayed')
+    }
+    spi = (schedule_stats['completed'] / schedule_stats['total_days']) if schedule_stats['total_days'] > 0 else 0
+
+    return {
+        "burn_rate": round(burn_rate, 2),
+        "total_planned": total_planned,
+        "total_committed": total_committed,
+        "total_actual": total_actual,
+        "variance": total_planned - total_actual,
+        "cpi": round(cpi, 2),
+        "spi": round(spi, 2),
+        "variance_by_dept": variance_by_dept,
+        "schedule_stats": schedule_stats
+    }
+
+
+def legacy_report_kpis(budgets):
+    if not budgets:
+        return {"message": "No budget data found"}
+
+    total_planned = sum(float(b['planned']) for b in budgets)
+    total_actual = sum(float(b['actual']) for b in budgets)
+    burn_rate = total_actual / total_planned if total_planned > 0 else 0
+
+    variance_by_dept = {}
+    for b in budgets:
+        variance_by_dept[b['dept']] = variance_by_dept.get(b['dept'], 0.0) + float(b['planned']) - float(b['actual'])
+
+    return {
+        "burn_rate": round(burn_rate, 2),
+        "total_planned": total_planned,
+        "total_actual": total_actual,
+        "variance": total_planned - total_actual,
+        "variance_by_dept": variance_by_dept,
+        "CPI": round(total_planned / total_actual, 2) if total_actual > 0 else 0
+    }
+
+
+# ----- Fixtures -----
+
+def budget(dept, planned, actual, committed=0.0, project_id="p1"):
+    return {"project_id": project_id, "dept": dept, "planned": planned, "committed": committed, "actual": actual}
+
+
+def days(*statuses, project_id="p1"):
+    return [{"project_id": project_id, "day": i + 1, "status": s} for i, s in enumerate(statuses)]
+
+
+CASES = {
+    "typical": (
+        [budget("camera", 1000, 800, 900), budget("sound", 500, 650, 600), budget("art", 1200, 300, 700)],
+        days("completed", "completed", "delayed", "planned", "planned")
+    ),
+    "several lines per department": (
+        [budget("camera", 100, 40), budget("camera", 250.5, 260.25), budget("crew", 75, 0)],
+        days("completed", "delayed")
+    ),
+    "nothing spent": (
+        [budget("camera", 1000, 0), budget("sound", 0, 0)],
+        days("planned")
+    ),
+    "nothing planned": (
+        [budget("misc", 0, 120.5)],
+        []
+    ),
+    "no schedule": (
+        [budget("camera", 300, 100)],
+        []
+    ),
+    "day without a status": (
+        [budget("camera", 100, 50)],
+        days("completed", None)
+    ),
+    "uneven ratios": (
+        [budget("camera", 3, 1), budget("sound", 7, 5), budget("art", 9, 8.333)],
+        days("completed", "planned", "planned", "delayed", "completed", "completed", "planned")
+    ),
+}
+
+
+def sqlite_db(budgets, schedules, pos=()):
+    db = SQLiteClient(":memory:")
+    db.table('projects').insert({"id": "p1", "title": "Film", "status": "active"}).execute()
+    for table, rows in (("budgets", budgets), ("schedules", schedules), ("pos", list(pos))):
+        if rows:
+            db.table(table).insert(rows).execute()
+    return db
+
+
+def without(d, *keys):
+    return {k: v for k, v in d.items() if k not in keys}
+
+
+# ----- Engine vs. the previous implementations -----
+
+@pytest.mark.parametrize("name", CASES)
+def test_engine_matches_calculate_kpis(name):
+    budgets, schedules = CASES[name]
+    kpis = compute_kpis(dataset_from_rows(budgets, schedules))
+    assert without(kpis, "burn_ratio") == legacy_calculate_kpis(budgets, schedules)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_report_view_matches_reports_endpoint(name):
+    budgets, schedules = CASES[name]
+    view = report_view(compute_kpis(dataset_from_rows(budgets, schedules)))
+    assert without(view, "SPI") == legacy_report_kpis(budgets)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_burn_rate_units_agree(name):
+    budgets, schedules = CASES[name]
+    kpis = compute_kpis(dataset_from_rows(budgets, schedules))
+    assert kpis['burn_ratio'] == pytest.approx(kpis['burn_rate'] / 100, abs=0.005)
+    assert report_view(kpis)['SPI'] == kpis['spi']
+
+
+def test_no_budget_lines():
+    assert compute_kpis(dataset_from_rows([], days("completed"))) is None
+    assert legacy_calculate_kpis([], []) == {"error": "No budget data found"}
+
+
+# ----- Portfolio engine -----
+
+def test_portfolio_matches_engine():
+    budgets, schedules = [], []
+    for i, (budget_rows, schedule_rows) in enumerate(CASES.values()):
+        budgets += [{**b, "project_id": f"p{i}"} for b in budget_rows]
+        schedules += [{**s, "project_id": f"p{i}"} for s in schedule_rows]
+
+    portfolio = compute_portfolio(budget_frame(budgets), schedule_frame(schedules))
+
+    for i, (budget_rows, schedule_rows) in enumerate(CASES.values()):
+        expected = without(compute_kpis(dataset_from_rows(budget_rows, schedule_rows)), "burn_ratio")
+        actual = portfolio['projects'][f"p{i}"]
+        assert actual['schedule_stats'] == expected['schedule_stats']
+        assert actual['variance_by_dept'].keys() == expected['variance_by_dept'].keys()
+        for dept, values in expected['variance_by_dept'].items():
+            assert actual['variance_by_dept'][dept] == pytest.approx(values)
+        assert without(actual, "schedule_stats", "variance_by_dept") == pytest.approx(
+            without(expected, "schedule_stats", "variance_by_dept")
+        )
+
+
+# ----- Incremental KPI store -----
+
+def test_store_events_match_recomputed_kpis():
+    budgets, schedules = CASES["typical"]
+    pos = [{"project_id": "p1", "amount": 100.0}]
+    db = sqlite_db(budgets, schedules, pos)
+
+    store = KPIStore()
+    asyncio.run(store.get(db, "p1"))
+    store.apply({"project_id": "p1", "type": "schedule_status_changed",
+                 "payload_json": {"schedule_id": 4, "from": "planned", "to": "completed"}})
+    store.apply({"project_id": "p1", "type": "po_created", "payload_json": {"amount": 25.5}})
+    schedules = [dict(s, status="completed") if s['day'] == 4 else s for s in schedules]
+    pos = pos + [{"project_id": "p1", "amount": 25.5}]
+
+    # Served from the store: the events are folded in without touching the tables
+    state = asyncio.run(store.get(db, "p1"))
+    assert store.stats()['seeds'] == 1
+    assert compute_kpis(state) == compute_kpis(dataset_from_rows(budgets, schedules))
+    assert state['pos'] == dataset_from_rows(budgets, schedules, pos)['pos']
+
+
+def test_store_drops_state_on_unknown_event():
+    budgets, schedules = CASES["typical"]
+    db = sqlite_db(budgets, schedules)
+    store = KPIStore()
+    asyncio.run(store.get(db, "p1"))
+
+    store.apply({"project_id": "p1", "type": "budget_changed", "payload_json": {}})
+    assert store.stats()['projects'] == 0
+    asyncio.run(store.get(db, "p1"))
+    assert store.stats()['seeds'] == 2
+
+
+def test_store_reseeds_expired_state():
+    budgets, schedules = CASES["typical"]
+    db = sqlite_db(budgets, schedules)
+    store = KPIStore(ttl=0)
+    asyncio.run(store.get(db, "p1"))
+
+    # Budget edits emit no events; the expired state is reseeded and picks them up
+    db.table('budgets').update({"actual": 0}).eq('project_id', "p1").execute()
+    state = asyncio.run(store.get(db, "p1"))
+    assert state['budget']['totals']['actual'] == 0
+
+
+def test_store_skips_events_seeded_before(monkeypatch):
+    import services.kpi_store as kpi_store_module
+
+    budgets, schedules = CASES["typical"]
+    db = sqlite_db(budgets, schedules, [{"project_id": "p1", "amount": 100.0}])
+    event = {"project_id": "p1", "type": "po_created", "payload_json": {"amount": 100.0}}
+    db.table('events').insert(event).execute()
+    monkeypatch.setattr(kpi_store_module, "get_db", lambda: db)
+    store = KPIStore()
+    tailer = kpi_store_module.EventTailer(store)
+    tailer.watermark = 0
+
+    # The PO and its event were committed before the seed; tailing the event must not count it again
+    asyncio.run(store.get(db, "p1"))
+    assert tailer.poll() == 1
+    assert asyncio.run(store.get(db, "p1"))['pos']['total_count'] == 1
+
+
+def test_tailer_applies_events_without_id_once(monkeypatch):
+    import services.kpi_store as kpi_store_module
+
+    budgets, schedules = CASES["typical"]
+    db = sqlite_db(budgets, schedules)
+    monkeypatch.setattr(kpi_store_module, "get_db", lambda: db)
+    store = KPIStore()
+    tailer = kpi_store_module.EventTailer(store)
+    assert tailer.poll() == 0
+    asyncio.run(store.get(db, "p1"))
+
+    # Inserted after the seed, without an event_id (an old spill file); later polls re-read it
+    db.table('events').insert({"project_id": "p1", "type": "po_created", "payload_json": {"amount": 25.5}}).execute()
+    assert [tailer.poll() for _ in range(3)] == [1, 0, 0]
+    assert asyncio.run(store.get(db, "p1"))['pos'] == {"total_count": 1, "total_amount": 25.5}
+
+
+# ----- Project cache -----
+
+def test_cache_generations_stay_bounded():
+    from services.cache import ProjectCache
+
+    cache = ProjectCache(max_entries=3)
+    generation = cache.generation("p1")
+    for i in range(10):
+        cache.invalidate(f"p{i}")
+    assert cache.stats()['invalidated_projects'] == 3
+
+    # p1's invalidation was dropped, but a read that started before it still can't store its rows
+    cache.set("p1", "budgets", ["stale"], generation)
+    assert cache.get("p1", "budgets") == (False, None)
+    cache.set("p1", "budgets", ["fresh"], cache.generation("p1"))
+    assert cache.get("p1", "budgets") == (True, ["fresh"])
+
+
+# ----- SQLite backend -----
+
+@pytest.mark.parametrize("name", CASES)
+def test_sqlite_views_match_python_aggregates(name):
+    budgets, schedules = CASES[name]
+    pos = [{"project_id": "p1", "amount": 100.0}, {"project_id": "p1", "amount": 25.5}]
+    state = asyncio.run(KPIStore().get(sqlite_db(budgets, schedules, pos), "p1"))
+
+    expected = dataset_from_rows(budgets, schedules, pos)
+    assert state['pos'] == expected['pos']
+    assert state['schedule'] == expected['schedule']
+    kpis, expected_kpis = compute_kpis(state), compute_kpis(expected)
+    assert kpis['variance_by_dept'].keys() == expected_kpis['variance_by_dept'].keys()
+    for dept, values in expected_kpis['variance_by_dept'].items():
+        assert kpis['variance_by_dept'][dept] == pytest.approx(values)
+    assert kpis['schedule_stats'] == expected_kpis['schedule_stats']
+    assert without(kpis, "variance_by_dept", "schedule_stats") == pytest.approx(
+        without(expected_kpis, "variance_by_dept", "schedule_stats")
+    )
+
+
+def test_sqlite_keyset_pages_cover_every_row_once():
+    order = [('day', False), ('id', False)]
+    rows = [{"project_id": "p1", "day": i % 4, "scene": f"s{i}"} for i in range(23)]
+    db = sqlite_db([], rows)
+
+    seen, cursor = [], None
+    while True:
+        query = apply_keyset(db.table('schedules').select("id,day").eq('project_id', "p1"), order, cursor)
+        page, next_cursor = paginate(query.limit(6).execute().data, order, 5)
+        seen += page
+        if not next_cursor:
+            break
+        cursor = decode_cursor(next_cursor)
+
+    assert len(seen) == len(rows)
+    assert len({r['id'] for r in seen}) == len(rows)
+    assert seen == sorted(seen, key=lambda r: (r['day'], r['id']))
+
+
+def test_select_in_pages_past_max_rows(monkeypatch):
+    import config.database as database
+
+    monkeypatch.setattr(database, "DB_PAGE_SIZE", 4)
+    monkeypatch.setattr(database, "IN_CHUNK_SIZE", 2)
+    rows = [{"project_id": f"p{i % 3}", "day": i} for i in range(23)]
+    db = sqlite_db([], rows)
+
+    found = asyncio.run(database.select_in(db, 'schedules', 'project_id', ["p0", "p1", "p2"], "id,day"))
+    assert sorted(r['day'] for r in found) == list(range(23))
+    assert len({r['id'] for r in found}) == len(rows)
+
+
+def test_select_all_pages_past_max_rows(monkeypatch):
+    import config.database as database
+
+    monkeypatch.setattr(database, "DB_PAGE_SIZE", 4)
+    db = SQLiteClient(":memory:")
+    db.table('projects').insert([
+        {"id": f"p{i:02}", "title": "Film", "status": "active" if i % 3 else "wrapped"} for i in range(20)
+    ]).execute()
+
+    found = asyncio.run(database.select_all(db, 'projects', status="active"))
+    assert [p['id'] for p in found] == [f"p{i:02}" for i in range(20) if i % 3]
+
+
+def test_sqlite_upsert_and_json_columns():
+    db = SQLiteClient(":memory:")
+    row = {"project_id": "p1", "dept": "", "day": "2024-01-01", "burn_rate": 10.0}
+    db.table('kpi_snapshots').upsert([row], on_conflict="project_id,dept,day").execute()
+    db.table('kpi_snapshots').upsert([{**row, "burn_rate": 20.0}], on_conflict="project_id,dept,day").execute()
+    result = db.table('kpi_snapshots').select("burn_rate", count="exact").eq('project_id', "p1").execute()
+    assert result.data == [{"burn_rate": 20.0}] and result.count == 1
+
+    db.table('events').insert({"project_id": "p1", "type": "po_created", "payload_json": {"amount": 5}}).execute()
+    event, = db.table('events').select("type,payload_json").gt('created_at', "2000").execute().data
+    assert event == {"type": "po_created", "payload_json": {"amount": 5}}
@@ -0,0 +1,291 @@
+# ============================================
+# FILE: utils/metrics.py
+# ============================================
+
+import os
+import json
+import time
+import bisect
+import threading
+import contextvars
+
+# Set METRICS_ENABLED=0 to skip request instrumentation entirely
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# Requests slower than this are logged with a timing breakdown (0 = off)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# Database / Gemini calls listed per slow request
+SLOW_REQUEST_MAX_CALLS = int(os.getenv("SLOW_REQUEST_MAX_CALLS", "20"))
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GEMINI_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+PROMPT_BUCKETS = (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _label_text(self, values, extra=None):
+        pairs = list(zip(self.labels, values)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            values = {key: (list(v) if isinstance(v, list) else v) for key, v in self._values.items()}
+        for key, value in sorted(values.items()):
+            lines += self._samples(key, value)
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self, key, value):
+        return [f"{self.name}{self._label_text(key)} {value}"]
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram; per label set it keeps one count per bucket, the sum and the count
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self, key, value):
+        samples, cumulative = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), value[:-2]):
+            cumulative += count
+            samples.append(f"{self.name}_bucket{self._label_text(key, ('le', bound))} {cumulative}")
+        samples.append(f"{self.name}_sum{self._label_text(key)} {value[-2]}")
+        samples.append(f"{self.name}_count{self._label_text(key)} {value[-1]}")
+        return samples
+
+
+_registry = []
+_collectors = {}
+
+
+def register_stats(prefix: str, stats):
+    """
+    Export the numeric values of a stats() dict as gauges named prefix_key
+    stats is called on every scrape
+    """
+    _collectors[prefix] = stats
+
+
+def render_metrics():
+    """
+    Every metric in the Prometheus text exposition format
+    Values are per worker process
+    """
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    for prefix, stats in _collectors.items():
+        try:
+            values = stats()
+        except Exception as e:
+            print(f"Error collecting {prefix} stats: {e}")
+            continue
+        for key, value in values.items():
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ----- Metrics -----
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_duration = Histogram(
+    "http_request_duration_seconds", "Time to send the full response", ("method", "route")
+)
+http_db_calls = Histogram(
+    "http_request_db_calls", "Database calls made by one request", ("route",), buckets=CALL_COUNT_BUCKETS
+)
+http_db_seconds = Histogram("http_request_db_seconds", "Database time of one request, summed over its calls", ("route",))
+
+db_duration = Histogram("db_query_duration_seconds", "Supabase round trip per query", ("table",))
+db_wait = Histogram("db_pool_wait_seconds", "Time a query waited for a free database thread")
+db_errors = Counter("db_query_errors_total", "Supabase queries that raised", ("table",))
+
+gemini_duration = Histogram(
+    "gemini_request_duration_seconds", "Gemini call latency, to the last chunk for streams", ("kind",),
+    buckets=GEMINI_BUCKETS
+)
+gemini_first_chunk = Histogram(
+    "gemini_first_chunk_seconds", "Time to the first streamed chunk", buckets=GEMINI_BUCKETS
+)
+gemini_wait = Histogram("gemini_queue_wait_seconds", "Time waiting for a Gemini concurrency slot")
+gemini_prompt = Histogram(
+    "gemini_prompt_chars", "Prompt size in characters", ("kind",), buckets=PROMPT_BUCKETS
+)
+gemini_requests = Counter("gemini_requests_total", "Gemini calls by outcome (ok, error, busy)", ("kind", "outcome"))
+
+
+# ----- Per-request timing -----
+
+class RequestTimings:
+    """
+    Database and Gemini calls made while serving one request
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = {"db": [0, 0.0], "gemini": [0, 0.0]}  # kind -> [calls, seconds]
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, name: str, started: float, seconds: float):
+        with self._lock:
+            total = self.totals[kind]
+            total[0] += 1
+            total[1] += seconds
+            if len(self.calls) < SLOW_REQUEST_MAX_CALLS:
+                self.calls.append({
+                    "kind": kind,
+                    "name": name,
+                    "start_ms": round((started - self.started) * 1000, 1),
+                    "ms": round(seconds * 1000, 1)
+                })
+
+    def breakdown(self):
+        """
+        Call counts and summed time per kind, plus the first calls in start order
+        Concurrent calls overlap, so the sums can exceed the request time
+        """
+        with self._lock:
+            return {
+                **{kind: {"calls": calls, "ms": round(seconds * 1000, 1)} for kind, (calls, seconds) in self.totals.items()},
+                "timeline": sorted(self.calls, key=lambda call: call['start_ms'])
+            }
+
+
+# The RequestTimings of the request being served, if any
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def query_table(query):
+    """
+    Table (or RPC) name of a Supabase query builder
+    """
+    request = getattr(query, "request", None)
+    path = getattr(request, "path", None)
+    if path is not None:
+        return str(path).rstrip("/").rsplit("/", 1)[-1]
+    return str(getattr(query, "table", "unknown"))
+
+
+def record_db_call(table: str, started: float, seconds: float, wait_seconds: float, error: bool = False):
+    db_duration.observe(seconds, table)
+    db_wait.observe(wait_seconds)
+    if error:
+        db_errors.inc(table)
+    timings = _current.get()
+    if timings is not None:
+        timings.add("db", table, started, seconds)
+
+
+def record_gemini_call(kind: str, started: float, seconds: float, prompt_chars: int, outcome: str = "ok",
+                       wait_seconds: float = None, first_chunk_seconds: float = None):
+    gemini_requests.inc(kind, outcome)
+    gemini_prompt.observe(prompt_chars, kind)
+    if wait_seconds is not None:
+        gemini_wait.observe(wait_seconds)
+    if outcome == "busy":
+        return
+    gemini_duration.observe(seconds, kind)
+    if first_chunk_seconds is not None:
+        gemini_first_chunk.observe(first_chunk_seconds)
+    timings = _current.get()
+    if timings is not None:
+        timings.add("gemini", kind, started, seconds)
+
+
+def route_template(scope):
+    """
+    Path template of the matched route (/projects/{project_id}/summary)
+    """
+    # FastAPI releases with lazily included routers keep the prefixed path here;
+    # older ones put the fully prefixed APIRoute itself in scope["route"]
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    route = context or scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and database calls per route, and logs slow requests
+
+    The route label is the path template (/projects/{project_id}/summary),
+    so the number of series stays bounded. Timing runs until the last body
+    chunk is sent, which for streamed responses includes the whole stream.
+    """
+
+    def __init__(self, app, slow_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - timings.started
+            route = route_template(scope)
+            method = scope["method"]
+
+            http_requests.inc(method, route, str(status))
+            http_duration.observe(elapsed, method, route)
+            db_calls, db_seconds = timings.totals["db"]
+            http_db_calls.observe(db_calls, route)
+            http_db_seconds.observe(db_seconds, route)
+
+            if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+                print(f"🐢 Slow request {method} {scope['path']} -> {status} in {elapsed * 1000:.0f} ms: "
+                      f"{json.dumps({'route': route, **timings.breakdown()})}")
@@ -0,0 +1,99 @@
+# ============================================
+# FILE: utils/pagination.py
+# ============================================
+
+import os
+import json
+import base64
+from fastapi import HTTPException
+
+# Page sizes for list endpoints; the server never returns more than MAX_PAGE_SIZE rows
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+# PostgREST count modes: exact scans the table, planned/estimated use planner statistics
+COUNT_MODES = ("none", "exact", "planned", "estimated")
+
+
+def clamp_limit(limit: int = None):
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def count_option(count: str):
+    """
+    Validate a ?count= value and return the argument for select(..., count=)
+    """
+    if count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count must be one of {', '.join(COUNT_MODES)}")
+    return None if count == "none" else count
+
+
+def encode_cursor(values: dict):
+    """Opaque cursor holding the sort-key values of the last row on a page"""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, dict):
+            raise ValueError("cursor must encode an object")
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _quote(value):
+    """Quote a value for a PostgREST or=(...) filter"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def apply_keyset(query, order, cursor: dict = None):
+    """
+    Order the query by `order` and, if a cursor is given, start after it
+
+    order is a list of (column, desc) pairs sharing one direction, ending in
+    a unique column (usually id) so ties never skip or repeat rows
+    """
+    for column, desc in order:
+        query = query.order(column, desc=desc)
+
+    if not cursor:
+        return query
+
+    try:
+        values = [cursor[column] for column, _ in order]
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if len(order) == 1:
+        column, desc = order[0]
+        return query.lt(column, values[0]) if desc else query.gt(column, values[0])
+
+    # (a, b) > (x, y)  ==  a > x  or  (a = x and b > y)
+    clauses = []
+    for i, (column, desc) in enumerate(order):
+        op = "lt" if desc else "gt"
+        terms = [f"{c}.eq.{_quote(v)}" for (c, _), v in zip(order[:i], values[:i])]
+        terms.append(f"{column}.{op}.{_quote(values[i])}")
+        clauses.append(f"and({','.join(terms)})" if len(terms) > 1 else terms[0])
+    return query.or_(",".join(clauses))
+
+
+def paginate(rows, order, limit: int):
+    """
+    Trim a limit+1 fetch to one page and build the cursor for the next one
+    Returns (page_rows, next_cursor or None)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor({column: last.get(column) for column, _ in order})
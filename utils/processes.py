@@ -0,0 +1,49 @@
+# ============================================
+# FILE: utils/processes.py
+# ============================================
+
+import os
+
+
+def _process_start(pid: int):
+    """
+    Start time of a process from /proc (Linux), or None if unavailable or not running
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def process_tag():
+    """
+    Tag for this process: pid plus process start time, so a restarted
+    worker that reuses a pid is not mistaken for the old one
+    Safe to use in file names
+    """
+    pid = os.getpid()
+    return f"{pid}-{_process_start(pid) or ''}"
+
+
+def process_alive(tag: str):
+    """
+    Whether the process that produced process_tag() `tag` is still running
+    """
+    if not tag:
+        return False
+    pid, _, started = tag.partition("-")
+    if not pid.isdigit():
+        return False
+    if os.path.isdir("/proc/self"):
+        return started != "" and _process_start(int(pid)) == started
+    if os.name == "nt":
+        # No cheap liveness check; treat it as running
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
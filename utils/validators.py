@@ -0,0 +1,37 @@
+# ============================================
+# FILE: utils/validators.py
+# ============================================
+
+from fastapi import HTTPException
+
+# Columns a client may request with ?fields= on each table
+ALLOWED_FIELDS = {
+    "projects": ("id", "title", "status", "created_at"),
+    "budgets": ("id", "project_id", "dept", "planned", "committed", "actual"),
+    "schedules": ("id", "project_id", "day", "scene", "location", "status"),
+    "pos": ("id", "project_id", "vendor", "amount", "status"),
+    "invoices": ("id", "po_id", "amount", "due_date", "status"),
+    "crew": ("id", "name", "role", "department", "email", "phone"),
+}
+
+
+def select_fields(table: str, fields: str = None, required=()):
+    """
+    Turn a ?fields=a,b,c query value into a Supabase select string
+
+    Every requested column must be in the table's allow-list. Columns the
+    endpoint itself needs (cursor keys, values it sums) are always added.
+    No fields means every column.
+    """
+    if not fields:
+        return "*"
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in ALLOWED_FIELDS[table]]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s) for {table}: {', '.join(unknown)}. Allowed: {', '.join(ALLOWED_FIELDS[table])}"
+        )
+
+    return ",".join(dict.fromkeys([*requested, *required]))